@@ -0,0 +1,65 @@
+# Food Group Solver
+#
+# Minimises the risk of different diseases by changing the level of intake of different food groups.
+# See FoodGroupSolver.py for where the data and equations come from.
+#
+# Importing the package only loads the risk curves and their evaluation from core. The solvers, simulation and plots
+# need scipy, process pools or matplotlib, so their functions are imported the first time they are used,
+# eg food_group_solver.simulate(...) or from food_group_solver import simulate.
+
+import importlib
+
+from .core import (Curve, average_defined, combined_category, combined_risk, compile_curves, food_groups, g_intake_range,
+                   load_response_curves, response_curves, risk, risk_batch, risk_curves, risk_groups, risk_matrix, risk_table,
+                   sample_bounds, save_response_curves)
+
+__all__ = ['Curve', 'average_defined', 'combined_category', 'combined_risk', 'compile_curves', 'food_groups', 'g_intake_range',
+           'load_response_curves', 'response_curves', 'risk', 'risk_batch', 'risk_curves', 'risk_groups', 'risk_matrix', 'risk_table',
+           'sample_bounds', 'save_response_curves']
+
+lazy_functions = {
+    'solve_bands': 'solvers',
+    'optimize_risk': 'solvers',
+    'optimize_starts': 'solvers',
+    'intake_range_index': 'simulation',
+    'BandTracker': 'simulation',
+    'RunningStats': 'simulation',
+    'Convergence': 'simulation',
+    'draw_diets': 'simulation',
+    'simulate': 'simulation',
+    'SampleStore': 'simulation',
+    'build_sample_store': 'simulation',
+    'summarize_store': 'simulation',
+    'plot_simulation': 'plots',
+    'plot_response_curves': 'plots',
+    'render': 'plots',
+    'Diet': 'search',
+    'coordinate_descent': 'search',
+    'hill_climb': 'search',
+    'refine': 'search',
+    'refine_bands': 'search',
+    'ParetoFront': 'pareto',
+    'non_dominated': 'pareto',
+    'pareto_front': 'pareto',
+    'domain_flags': 'scoring',
+    'read_diets': 'scoring',
+    'score_file': 'scoring',
+    'serve': 'server',
+    'score_remote': 'server',
+    'ResultCache': 'cache',
+    'cached_simulate': 'cache',
+    'cached_solve_bands': 'cache',
+    'cached_response_curves': 'cache',
+    'Ensemble': 'uncertainty',
+    'ensemble_bands': 'uncertainty',
+    'check_agreement': 'benchmark',
+    'run_benchmarks': 'benchmark',
+    'Metrics': 'metrics',
+    'metrics': 'metrics',
+}
+
+
+def __getattr__(name):
+    if name in lazy_functions:
+        return getattr(importlib.import_module('.' + lazy_functions[name], __name__), name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
@@ -0,0 +1,278 @@
+# Food Group Solver - benchmarks
+#
+# How fast the evaluation of the curves, the random simulation, the optimizer and the plots are, on fixed random diets and
+# seeds so runs on the same machine can be compared: the time of one risk() call, diets per second of risk_batch() and
+# risk_matrix() for several numbers of diets at once, the diets and time the random simulation takes to come within a margin
+# of the exact lowest risk of some ranges of total grams, the evaluations the optimizer takes to converge and the time to
+# render the 78 PNG files. Results are a flat dict of numbers, saved as JSON and compared with a baseline from an earlier run.
+#
+# Before timing anything, check_agreement() scores the same diets with every faster way of scoring them (risk_batch(),
+# risk_matrix(), response_curves(), search.Diet, the bulk scorer and the scoring server) and compares them with risk().
+
+import asyncio
+import contextlib
+import io
+import json
+import numpy as np
+import os
+import platform
+import tempfile
+import threading
+import time
+
+from .core import food_groups, g_intake_range, response_curves, response_grid, risk, risk_batch, risk_groups, risk_matrix, sample_bounds
+from .simulation import BandTracker, draw_diets, run_chunks, simulate, simulate_chunk, simulation_tasks
+
+batch_sizes = [1, 100, 10000, 100000]  # Diets scored at once by the batch benchmarks
+target_ranges = [(1000, 1250), (1250, 1500), (1500, 1750)]  # Ranges of total grams the random simulation has to reach the target in
+target_margin = 0.0075  # How close to the exact lowest risk of each range the random simulation has to come
+agreement_tolerance = 1e-12  # Largest relative difference from risk() that check_agreement() allows, which is a few roundings
+
+def average_risk(risk_category, diet):
+    # Average risk of one diet from risk(), the way the original script scores it, NaN when it has no risk factors
+    factors = risk(risk_category, list(diet))
+    return float(np.average(factors)) if factors else np.nan
+
+def benchmark_diets(count, seed=0):
+    # Fixed diets to check and time the evaluation with: half in whole grams within sample_bounds like the simulation, half
+    # from 0 to 500 grams of every food group, so many are outside some curves. Returns the whole diets and the same diets
+    # with a random fraction of a gram added, like the diets of the optimizer.
+    generator = np.random.default_rng(seed)
+    diets = np.concatenate([draw_diets(generator, count - count // 2, sample_bounds),
+                            draw_diets(generator, count // 2, [(0, 501)] * len(food_groups))])
+    return diets, diets + generator.random(diets.shape)
+
+def largest_difference(expected, values):
+    # Largest difference between two arrays of risks relative to the expected risk, infinite where only one of them has no
+    # risk. Relative, as some curves reach 1e17 where rounding alone is far more than any fixed difference.
+    expected = np.asarray(expected, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if not np.array_equal(np.isnan(expected), np.isnan(values)):
+        return np.inf
+    defined = ~np.isnan(expected)
+    differences = np.abs(expected - values)[defined] / np.maximum(np.abs(expected[defined]), np.finfo(float).tiny)
+    return float(differences.max()) if differences.size else 0.0
+
+@contextlib.contextmanager
+def running_server():
+    # A scoring server on a free port in a thread of its own, yielding the port
+    from .server import serve
+
+    loop = asyncio.new_event_loop()
+    listening = threading.Event()
+    server = {}
+
+    def started(listener):
+        server['port'] = listener.sockets[0].getsockname()[1]
+        listening.set()
+
+    def run():
+        server['task'] = loop.create_task(serve('127.0.0.1', 0, started=started))
+        try:
+            loop.run_until_complete(server['task'])
+        except asyncio.CancelledError:
+            pass
+        finally:
+            listening.set()  # Also when the server failed to start
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    listening.wait()
+    try:
+        if 'port' not in server:
+            server['task'].result()  # Raise the error that stopped the server
+        yield server['port']
+    finally:
+        loop.call_soon_threadsafe(server['task'].cancel)
+        thread.join()
+        loop.close()
+
+def check_agreement(count=2000, seed=0, risk_categories=risk_groups):
+    # Largest relative difference between the average risk from risk() and from each faster way of scoring count fixed diets, as
+    # {way: difference}. Where risk() has no risk every way must have none, otherwise the difference is infinite.
+    from .scoring import score_file
+    from .search import Diet
+    from .server import score_remote
+
+    whole, fractional = benchmark_diets(count, seed)
+    expected = np.array([[average_risk(risk_category, diet) for risk_category in risk_categories] for diet in whole])
+    expected_fractional = np.array([[average_risk(risk_category, diet) for risk_category in risk_categories] for diet in fractional])
+
+    differences = {}
+    differences['risk_batch'] = max(largest_difference(expected[:, position], risk_batch(risk_category, whole)[1])
+                                    for position, risk_category in enumerate(risk_categories))
+    differences['risk_batch fractional grams'] = max(largest_difference(expected_fractional[:, position], risk_batch(risk_category, fractional)[1])
+                                                     for position, risk_category in enumerate(risk_categories))
+    differences['risk_matrix'] = largest_difference(expected, risk_matrix(risk_categories, whole))
+    differences['risk_matrix fractional grams'] = largest_difference(expected_fractional, risk_matrix(risk_categories, fractional))
+
+    # A diet with every food group at the same grams, averaged over the food groups of the response curves
+    curves = response_curves(response_grid, risk_categories)
+    with np.errstate(all='ignore'):
+        curve_averages = np.nansum(curves, axis=1) / (~np.isnan(curves)).sum(axis=1)
+    differences['response_curves'] = max(largest_difference([average_risk(risk_category, [g] * len(food_groups)) for g in response_grid], curve_averages[position])
+                                         for position, risk_category in enumerate(risk_categories))
+
+    differences['search.Diet'] = max(largest_difference(expected[:, position], [Diet(risk_category, diet).average() for diet in whole])
+                                     for position, risk_category in enumerate(risk_categories))
+
+    with tempfile.TemporaryDirectory() as folder:
+        np.save(os.path.join(folder, 'diets.npy'), whole)
+        score_file(os.path.join(folder, 'diets.npy'), os.path.join(folder, 'risks.npy'), risk_categories, chunk_size=max(1, count // 3))
+        scored = np.load(os.path.join(folder, 'risks.npy'))
+        differences['score_file'] = largest_difference(expected, np.stack([scored[risk_category] for risk_category in risk_categories], axis=1))
+
+    with running_server() as port:
+        risks = {risk_category: [] for risk_category in risk_categories}
+        for start in range(0, count, 500):
+            for risk_category, values in score_remote(whole[start:start + 500].tolist(), risk_categories, port=port).items():
+                risks[risk_category].extend(np.nan if value is None else value for value in values)
+        differences['server'] = largest_difference(expected, np.array([risks[risk_category] for risk_category in risk_categories]).T)
+
+    return differences
+
+def best_time(function, repeats=3):
+    # Shortest of repeats runs of function, in seconds
+    times = []
+    for repeat in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def time_risk(diets, risk_categories=risk_groups):
+    # Seconds per risk() call for one diet, over every diet and risk category
+    diets = [list(diet) for diet in diets]
+
+    def score():
+        for risk_category in risk_categories:
+            for diet in diets:
+                risk(risk_category, diet)
+
+    return best_time(score) / (len(diets) * len(risk_categories))
+
+def time_batches(sizes=batch_sizes, seed=0, risk_categories=risk_groups):
+    # Diets per second of risk_batch() for each risk category in turn and of risk_matrix() for all of them, at each size
+    results = {}
+    for size in sizes:
+        diets = benchmark_diets(size, seed)[0]
+        calls = max(1, 10000 // size)  # Small batches are timed over many calls
+        risk_matrix(risk_categories, diets)  # Build the tables outside of the timing
+
+        def batch():
+            for call in range(calls):
+                for risk_category in risk_categories:
+                    risk_batch(risk_category, diets)
+
+        def matrix():
+            for call in range(calls):
+                risk_matrix(risk_categories, diets)
+
+        results['risk_batch %d diets_per_second' % size] = size * calls / best_time(batch)
+        results['risk_matrix %d diets_per_second' % size] = size * calls / best_time(matrix)
+    return results
+
+def time_to_target(risk_category, random_tries=1000000, chunk_size=1000, seed=0, sampler='random', ranges=target_ranges, margin=target_margin):
+    # Diets and seconds the random simulation of risk_category takes, on this process, before its lowest risk in each of
+    # ranges is within margin of the exact lowest risk from solve_bands(). Returns the targets, and None for the diets and
+    # seconds if random_tries diets do not reach them.
+    from .solvers import solve_bands
+
+    exact = solve_bands(risk_category, sample_bounds, ranges)
+    targets = [solution[2] + margin for solution in exact]
+    tracker = BandTracker(ranges, 1)
+    tasks = simulation_tasks([risk_category], random_tries, sample_bounds, ranges, seed, chunk_size, 1, 1, False, sampler)
+    diets = 0
+
+    def reached():
+        return all(len(risks) and risks[0] <= target for risks, target in zip(tracker.risks, targets))
+
+    start = time.perf_counter()
+    for chunk in run_chunks(simulate_chunk, tasks, 1, lambda task: not reached()):
+        chunk_tracker, chunk_stats = chunk[risk_category]
+        tracker.merge(chunk_tracker)
+        diets += chunk_stats.count
+    seconds = time.perf_counter() - start
+    if not reached():
+        return targets, None, None
+    return targets, diets, seconds
+
+def time_optimizer(risk_category, starts=10, seed=0):
+    # Total evaluations, iterations and seconds of optimize_risk() from starts fixed initial guesses, with its lowest risk
+    from .solvers import optimize_risk
+
+    generator = np.random.default_rng(seed)
+    initial_guesses = [[int(generator.integers(low, high)) for low, high in sample_bounds] for start in range(starts)]
+    start = time.perf_counter()
+    solutions = [optimize_risk(risk_category, initial_grams_guess) for initial_grams_guess in initial_guesses]
+    seconds = time.perf_counter() - start
+    return sum(solution.nfev for solution in solutions), sum(solution.nit for solution in solutions), seconds, min(float(solution.fun) for solution in solutions)
+
+def time_render(random_tries=100000, seed=0, processes=None):
+    # Number of plots and seconds to render the scatter plot of each risk category and the response curve of each food
+    # group for each risk category, as FoodGroupSolver.py does, into a temporary folder
+    from .cli import fit_equation
+    from .plots import render, response_curve_plots, simulation_plot
+
+    simulations = simulate(risk_groups, random_tries, sample_bounds, g_intake_range, seed=seed, processes=processes, shared=True)
+    plots = [simulation_plot(risk_category, simulations[risk_category]['stats'], fit_equation(simulations[risk_category]['stats']))
+             for risk_category in risk_groups]
+    with contextlib.redirect_stdout(io.StringIO()):  # response_curve_plots() prints each food group
+        plots += response_curve_plots()
+    with tempfile.TemporaryDirectory() as folder:
+        plots = [(os.path.join(folder, plot[0]),) + tuple(plot[1:]) for plot in plots]
+        start = time.perf_counter()
+        render(plots, processes)
+        return len(plots), time.perf_counter() - start
+
+def run_benchmarks(quick=False, seed=0, processes=None):
+    # Check that every faster way of scoring agrees with risk(), then run every benchmark. quick runs smaller benchmarks.
+    # Returns {'settings', 'machine', 'agreement', 'agrees', 'results'}, where results is a flat dict of numbers.
+    settings = {'quick': quick, 'seed': seed, 'processes': processes, 'batch_sizes': batch_sizes[:-1] if quick else batch_sizes,
+                'target_ranges': target_ranges, 'target_margin': target_margin, 'random_tries': 200000 if quick else 1000000,
+                'starts': 3 if quick else 10}
+    machine = {'platform': platform.platform(), 'processor': platform.processor(), 'cpus': os.cpu_count(),
+               'python': platform.python_version(), 'numpy': np.__version__}
+
+    agreement = check_agreement(500 if quick else 2000, seed)
+    results = {}
+    results['risk seconds_per_call'] = time_risk(benchmark_diets(200 if quick else 1000, seed)[0])
+    results.update(time_batches(settings['batch_sizes'], seed))
+    for risk_category in risk_groups:
+        targets, diets, seconds = time_to_target(risk_category, settings['random_tries'], seed=seed)
+        results['simulate %s diets_to_target' % risk_category] = diets
+        results['simulate %s seconds_to_target' % risk_category] = seconds
+        evaluations, iterations, seconds, lowest = time_optimizer(risk_category, settings['starts'], seed)
+        results['optimize %s evaluations' % risk_category] = evaluations
+        results['optimize %s iterations' % risk_category] = iterations
+        results['optimize %s seconds' % risk_category] = seconds
+    plots, seconds = time_render(20000 if quick else 100000, seed, processes)
+    results['render plots'] = plots
+    results['render seconds'] = seconds
+
+    return {'settings': settings, 'machine': machine, 'agreement': agreement,
+            'agrees': all(difference <= agreement_tolerance for difference in agreement.values()), 'results': results}
+
+def compare(results, baseline, threshold=0.2):
+    # Each result also in the baseline, as [name, baseline value, value, ratio, regression], where a regression is worse than
+    # the baseline by more than threshold: slower for diets per second, and higher for everything else.
+    # Either argument can be the dict of run_benchmarks() or only its results.
+    results = results.get('results', results)
+    baseline = baseline.get('results', baseline)
+    rows = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if value is None or old is None or old == 0 or name == 'render plots':
+            continue
+        ratio = value / old
+        regression = ratio < 1 / (1 + threshold) if name.endswith('per_second') else ratio > 1 + threshold
+        rows.append([name, old, value, ratio, regression])
+    return rows
+
+def save_results(path, results):
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=1)
+
+def load_results(path):
+    with open(path) as file:
+        return json.load(file)
@@ -0,0 +1,159 @@
+# Food Group Solver - result cache
+#
+# Results saved on disk under a hash of everything they depend on: the equations and ranges of the curves, the sampling
+# bounds, the ranges of total grams, the number of random tries and the seed. A repeated run with the same inputs reads
+# the results back instead of computing them, and a change to the curves of one risk category only recomputes that one.
+# Each result is a .npz file of numpy arrays, and the least recently used ones are deleted when the folder gets too big.
+
+import hashlib
+import json
+import numpy as np
+import os
+import tempfile
+
+from .core import combined_category, food_groups, response_curves, response_grid, risk_curves, risk_groups
+
+cache_version = 2  # Change when the arrays saved for a result change, so old results are not read back
+
+
+def cache_key(*parts):
+    # Hash of any JSON-compatible values, as a hexadecimal file name
+    text = json.dumps([cache_version, food_groups] + list(parts), sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def curve_signature(risk_category):
+    # Ranges and equations of the curves of a risk category, which decide every result computed from them
+    return [[curve.low, curve.high, curve.equation] for curve in risk_curves.get(risk_category, [])]
+
+
+class ResultCache:
+    # Folder of results, each a dict of numpy arrays saved as '<key>.npz'. Reading a result marks it as used, and saving one
+    # deletes the least recently used results until the folder holds at most max_bytes (the newest result is always kept).
+
+    def __init__(self, path, max_bytes=1 << 30):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def filename(self, key):
+        return os.path.join(self.path, key + '.npz')
+
+    def get(self, key):
+        # The arrays saved under key, or None if there are none
+        filename = self.filename(key)
+        try:
+            with np.load(filename) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError):  # Missing, or left unreadable by an interrupted run
+            return None
+        os.utime(filename)
+        return arrays
+
+    def put(self, key, arrays):
+        # Save a dict of arrays under key. It is written to a temporary file first, so readers never see half a result.
+        handle, temporary = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        with os.fdopen(handle, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(temporary, self.filename(key))
+        self.evict()
+
+    def evict(self):
+        # Delete the least recently used results until the folder holds at most max_bytes
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith('.npz'):
+                status = os.stat(os.path.join(self.path, name))
+                entries.append((status.st_mtime, status.st_size, name))
+        entries.sort(reverse=True)
+        total = 0
+        for position, (used, size, name) in enumerate(entries):
+            total += size
+            if total > self.max_bytes and position > 0:
+                os.remove(os.path.join(self.path, name))
+
+
+def cached_simulate(cache, risk_categories, random_tries, bounds, g_intake_range, seed=None, processes=None, chunk_size=100000,
+                    sample_size=10000, k=10, shared=False, sampler='random', tolerance=None, window=3):
+    # simulate() with the results of each risk category read from cache when they were computed before with the same inputs,
+    # so only the risk categories that are not in the cache are simulated, with the same random diets simulate() would give
+    # them. The combined risk of shared diets needs every risk category, so they are all simulated again when it is missing,
+    # as they are when shared diets stop early, since that depends on every risk category.
+    # Without a seed the results are never the same twice, so nothing is cached.
+    from .simulation import BandTracker, Convergence, RunningStats, merge_chunks, simulate, simulate_chunk, simulation_tasks
+
+    settings = [bounds, g_intake_range, random_tries, seed, chunk_size, sample_size, k, shared, sampler, tolerance, window]
+    if seed is None:
+        return simulate(risk_categories, random_tries, bounds, g_intake_range, seed, processes, chunk_size, sample_size, k, shared,
+                        sampler, tolerance, window)
+
+    keys = {}
+    for position, risk_category in enumerate(risk_categories):
+        keys[risk_category] = cache_key('simulate', curve_signature(risk_category), settings, None if shared else position)
+    if shared and len(risk_categories) > 1:
+        keys[combined_category] = cache_key('simulate', [curve_signature(risk_category) for risk_category in risk_categories], settings)
+
+    simulations = {}
+    for risk_category, key in keys.items():
+        arrays = cache.get(key)
+        if arrays is not None:
+            tracker = BandTracker.from_arrays(g_intake_range, unprefixed(arrays, 'tracker_'))
+            stats = RunningStats.from_arrays(g_intake_range, unprefixed(arrays, 'stats_'))
+            convergence = Convergence.from_arrays(unprefixed(arrays, 'convergence_'))
+            simulations[risk_category] = {'tracker': tracker, 'stats': stats, 'convergence': convergence, 'g_vars': tracker.g_vars(), 'best': tracker.best()}
+
+    missing = [risk_category for risk_category in risk_categories if risk_category not in simulations]
+    if (missing and shared and tolerance is not None) or (combined_category in keys and combined_category not in simulations):
+        missing = risk_categories
+    if missing:
+        tasks = simulation_tasks(risk_categories, random_tries, bounds, g_intake_range, seed, chunk_size, sample_size, k, shared, sampler)
+        if shared:
+            tasks = [(missing,) + task[1:] for task in tasks]
+        else:
+            tasks = [task for task in tasks if task[0][0] in missing]
+        computed = merge_chunks(simulate_chunk, tasks, g_intake_range, processes, sample_size, k, tolerance, window)
+        if len(missing) < len(risk_categories):
+            computed.pop(combined_category, None)  # Only the average over the missing risk categories, the cached one is kept
+        for risk_category, simulation in computed.items():
+            arrays = {}
+            for part in ['tracker', 'stats', 'convergence']:
+                arrays.update({part + '_' + name: array for name, array in simulation[part].arrays().items()})
+            cache.put(keys[risk_category], arrays)
+        simulations.update(computed)
+
+    return {risk_category: simulations[risk_category] for risk_category in keys}
+
+
+def unprefixed(arrays, prefix):
+    # The arrays whose names start with prefix, without it
+    return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+
+
+def cached_solve_bands(cache, risk_category, bounds, g_intake_range):
+    # solve_bands() read from cache when it was solved before with the same curves, bounds and ranges
+    from .solvers import solve_bands
+
+    key = cache_key('solve_bands', curve_signature(risk_category), bounds, g_intake_range)
+    arrays = cache.get(key)
+    if arrays is None:
+        solutions = solve_bands(risk_category, bounds, g_intake_range)
+        solved = [solution is not None for solution in solutions]
+        arrays = {'solved': np.array(solved),
+                  'diets': np.array([solution[0] if solution is not None else [0] * len(food_groups) for solution in solutions]).reshape(-1, len(food_groups)),
+                  'risks': np.array([solution[2] if solution is not None else np.nan for solution in solutions])}
+        cache.put(key, arrays)
+        return solutions
+
+    return [[diet.tolist(), int(diet.sum()), float(risk)] if solved else None
+            for solved, diet, risk in zip(arrays['solved'], arrays['diets'], arrays['risks'])]
+
+
+def cached_response_curves(cache, grid=response_grid, risk_categories=risk_groups):
+    # response_curves() read from cache when it was computed before with the same curves and grid
+    grid = np.asarray(grid)
+    key = cache_key('response_curves', [curve_signature(risk_category) for risk_category in risk_categories], grid.tolist())
+    arrays = cache.get(key)
+    if arrays is None:
+        arrays = {'curves': response_curves(grid, risk_categories)}
+        cache.put(key, arrays)
+    return arrays['curves']
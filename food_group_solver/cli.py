@@ -0,0 +1,479 @@
+# Food Group Solver - command line
+#
+# python -m food_group_solver <command>, where the command is one of
+#   optimize   lowest risk diets from random initial guesses with the gradient solver
+#   solve      exact lowest risk diet in each range of total grams
+#   simulate   random simulation of diets across the ranges of total grams, with scatter plots
+#   plot       response curve of each food group for each risk category
+#   pareto     diets of each range of total grams that no other diet beats in every risk category, and the best of them
+#              for a weighting of the risk categories
+#   score      risk of every diet in a CSV or .npy file of diets, written to another file
+#   serve      scoring server for other programs, see food_group_solver.server
+#   uncertainty  how the lowest risk diet of each range of total grams holds up when the coefficients of the curves change
+#   benchmark  speed of the evaluation, simulation, optimizer and plots compared with an earlier run, after checking that
+#              every faster way of scoring diets agrees with risk()
+#   all        optimize, solve, simulate and plot, which is what running FoodGroupSolver.py does
+#
+# The PNG files of the simulate and plot commands are saved at the end of the run, in parallel. Every run ends by writing
+# the time of each phase and other metrics to a JSON file, see food_group_solver.metrics.
+# The solvers, simulation and plots are only imported by the commands that use them.
+
+import argparse
+import json
+import numpy as np
+import os
+
+from .core import combined_category, food_groups, g_intake_range, response_curves, risk, risk_curves, risk_groups, sample_bounds, save_response_curves
+from .metrics import metrics, simulation_metrics
+
+simulation_tries = 1000000  # Random diets of the simulation when --tries is not given
+
+
+def fit_equation(stats):
+    # Linear fit of the risk against the total grams of a simulation, as text
+    if stats.fit() is None:
+        return 'No linear fit of ' + str(stats.count) + ' diets'
+    m, b, r2 = stats.fit()  # m = slope, b = intercept
+    return 'y = ' + str(round(m, 7)) + 'x' ' + ' + str(round(b, 7)) + '  r^2 = ' + str(round(r2, 7))
+
+
+def positive_int(text):
+    # Whole number of at least 1, for argparse
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError('%s is not a whole number of at least 1' % text)
+    return value
+
+
+def category_weight(text):
+    # (risk category, weight) of a CATEGORY=WEIGHT option, for argparse
+    risk_category, separator, value = text.rpartition('=')
+    if risk_category not in risk_groups:
+        raise argparse.ArgumentTypeError('%s is not CATEGORY=WEIGHT with a category of %s' % (text, risk_groups))
+    try:
+        weight = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('the weight of %s is not a number' % text)
+    if not 0 <= weight < np.inf:
+        raise argparse.ArgumentTypeError('the weight of %s is not a positive number or 0' % text)
+    return risk_category, weight
+
+
+def open_cache(args):
+    # The ResultCache of --cache, or None to compute everything
+    if args.cache is None:
+        return None
+    from .cache import ResultCache
+    return ResultCache(args.cache, args.cache_size * 1024 * 1024)
+
+
+def run_optimize(args):
+    # Mathematical attempt to find the minimum risk. The grams of each food group are kept within the range of its curve,
+    # so there are no solutions with negative numbers. With --band, the total grams are kept within that range as well.
+    from .simulation import BandTracker
+    from .solvers import optimize_starts
+
+    risk_category = args.category
+    print('\nSolution')
+
+    # Generate random values for grams for each food group as the initial guesses, then solve them all in parallel
+    generator = np.random.default_rng(args.seed)
+    initial_guesses = [[int(generator.integers(low, high)) for low, high in sample_bounds] for g in range(args.starts)]
+    with metrics.timer('optimize'):
+        solutions = optimize_starts(risk_category, initial_guesses, g_range=args.band, processes=args.processes)
+    metrics.count('optimizer_starts', len(solutions))
+    metrics.count('optimizer_evaluations', sum(solution.nfev for solution in solutions))
+    metrics.count('optimizer_failed_starts', sum(1 for solution in solutions if not (solution.success and solution.feasible)))
+    tracker = BandTracker(g_intake_range)
+
+    for g, solution in enumerate(solutions):
+        print('\nMath Solution Test', g)
+        print(solution.message, solution.nfev, 'evaluations')
+        if not (solution.success and solution.feasible):
+            print('Skipped, as the optimizer did not converge to a diet within the curves')
+            continue
+
+        # Show solution
+        round_solution_x = [int('{:.0f}'.format(f_grams)) for f_grams in list(solution.x)]  # Hide decimals
+        risk_solution_y = np.average(risk(risk_category, round_solution_x))
+        print(round_solution_x, sum(round_solution_x), risk_solution_y)
+
+        # Save the smallest set of grams for the food groups in each range
+        tracker.add([round_solution_x], [risk_solution_y])
+
+    smallest_x_risk, grams_sum, smallest_y_risk = tracker.best()
+    print(smallest_x_risk, grams_sum, smallest_y_risk)
+
+    if args.refine:
+        # Within the same ranges of grams of each food group as the optimizer
+        print_refined(risk_category, tracker.g_vars(), [(curve.low, curve.high + 1) for curve in risk_curves[risk_category]])
+
+
+def print_refined(risk_category, g_vars, bounds):
+    # The lowest risk diet of each range of total grams after a local search from g_vars within bounds
+    from .search import refine_bands
+
+    with metrics.timer('refine'):
+        refined, evaluations = refine_bands(risk_category, g_vars, bounds, g_intake_range)
+    metrics.count('refine_evaluations', evaluations)
+    print('\nRefined Solutions across Ranges ' + risk_category)
+    print(g_intake_range)
+    print(food_groups)
+    for g in refined:
+        print(g)
+    print('Diets scored', evaluations)
+
+
+def run_solve(args):
+    # The exact lowest risk diet for each range of total grams, within the same ranges of grams as the random numbers
+    from .solvers import solve_bands
+
+    cache = open_cache(args)
+    for risk_category in args.categories or risk_groups:
+        print('\nExact Solutions across Ranges ' + risk_category)
+        print(g_intake_range)
+        print(food_groups)
+        with metrics.timer('solve'):
+            if cache is None:
+                solutions = solve_bands(risk_category, sample_bounds, g_intake_range)
+            else:
+                from .cache import cached_solve_bands
+                solutions = cached_solve_bands(cache, risk_category, sample_bounds, g_intake_range)
+        for g in solutions:
+            print(g)
+
+
+def run_simulate(args):
+    # Model simulation using random numbers only. The random diets are scored in chunks spread over all cores, keeping only
+    # running statistics so any number of tries fits in memory. A seed repeats the same random numbers, which gives exactly
+    # the same results whatever the number of cores.
+    from .simulation import build_sample_store, simulate, summarize_store
+
+    if args.store is not None:
+        check_store(args)
+    tries = simulation_tries if args.tries is None else args.tries
+    cache = open_cache(args)
+    with metrics.timer('simulate'):
+        if args.store is None and cache is not None:
+            from .cache import cached_simulate
+            simulations = cached_simulate(cache, risk_groups, tries, sample_bounds, g_intake_range, seed=args.seed, processes=args.processes,
+                                          chunk_size=args.chunk_size, sample_size=args.sample_size, shared=not args.separate, sampler=args.sampler,
+                                          tolerance=args.tolerance, window=args.window)
+        elif args.store is None:
+            simulations = simulate(risk_groups, tries, sample_bounds, g_intake_range, seed=args.seed, processes=args.processes,
+                                   chunk_size=args.chunk_size, sample_size=args.sample_size, shared=not args.separate, sampler=args.sampler,
+                                   tolerance=args.tolerance, window=args.window)
+        else:
+            if not os.path.exists(os.path.join(args.store, 'store.json')):
+                build_sample_store(args.store, tries, sample_bounds, risk_groups, seed=args.seed, processes=args.processes, chunk_size=args.chunk_size)
+            simulations = summarize_store(args.store, g_intake_range, seed=args.seed, processes=args.processes, chunk_size=args.chunk_size,
+                                          sample_size=args.sample_size)
+    metrics.record('simulation', simulation_metrics(simulations, g_intake_range, metrics.phases['simulate']))
+
+    for risk_category in risk_groups:
+        simulation = simulations[risk_category]
+        stats = simulation['stats']
+        smallest_x_risk, grams_sum, smallest_y_risk = simulation['best']
+
+        print(smallest_x_risk, grams_sum, smallest_y_risk)
+
+        print('\n' + risk_category)
+        print('\nRandom Solutions across Ranges ' + risk_category)
+        print(g_intake_range)
+        print(food_groups)
+        for g in simulation['g_vars']:
+            print(g)
+        print('Diets in each range', stats.range_counts)
+        print('Average risk in each range', stats.range_mean_risk())
+
+        print('\nTop Random Solutions across Ranges ' + risk_category)
+        for band, (g1, g2) in enumerate(g_intake_range):
+            for g in simulation['tracker'].top(band):
+                print((g1, g2), g)
+
+        print('\nBest Random Solution ' + risk_category)
+        print(smallest_x_risk, sum(smallest_x_risk), smallest_y_risk)
+
+        if args.refine:
+            print_refined(risk_category, simulation['g_vars'], sample_bounds)
+
+        print_convergence(risk_category, simulation['convergence'])
+
+        # Show scatter plot of a random sample of the diets with the linear fit and equation of all of them
+        equation = fit_equation(stats)
+        print(equation)
+        if args.plots:
+            from .plots import simulation_plot
+            args.rendering.append(simulation_plot(risk_category, stats, equation, args.density_points))
+
+    if combined_category in simulations:
+        print('\nRandom Solutions across Ranges ' + combined_category + ' ' + str(risk_groups))
+        print(g_intake_range)
+        print(food_groups)
+        for g in simulations[combined_category]['g_vars']:
+            print(g)
+
+        print('\nBest Random Solution ' + combined_category)
+        print(simulations[combined_category]['best'])
+
+        print_convergence(combined_category, simulations[combined_category]['convergence'])
+
+    if args.trace:
+        with open(args.trace, 'w') as file:
+            json.dump({risk_category: simulation['convergence'].trace() for risk_category, simulation in simulations.items()}, file, indent=1)
+
+
+def check_store(args):
+    # A sample store always holds random diets shared by every risk category, and an existing one is summarized as it is,
+    # so stop rather than ignore options that ask for other diets
+    ignored = [option for option, used in [('--sampler', args.sampler != 'random'), ('--tolerance', args.tolerance is not None), ('--separate', args.separate)] if used]
+    if ignored:
+        raise SystemExit('--store keeps random diets shared by every risk category, so it cannot be used with ' + ', '.join(ignored))
+    if not os.path.exists(os.path.join(args.store, 'store.json')):
+        return
+    with open(os.path.join(args.store, 'store.json')) as file:
+        settings = json.load(file)
+    if args.tries is not None and args.tries != settings['samples']:
+        raise SystemExit('%s holds %d diets, not the %d of --tries' % (args.store, settings['samples'], args.tries))
+    if args.seed is not None and args.seed != settings['seed']:
+        raise SystemExit('%s holds diets drawn with seed %s, not the %d of --seed' % (args.store, settings['seed'], args.seed))
+
+
+def print_convergence(risk_category, convergence):
+    # Largest drop of the lowest risk of any range after each chunk, and whether it had converged at the end
+    print('\nConvergence ' + risk_category)
+    for tries, improvement in zip(convergence.tries, convergence.improvement):
+        print(tries, improvement)
+    if convergence.converged():
+        print('Converged after', convergence.tries[-1], 'diets')
+
+
+def run_plot(args):
+    from .plots import response_curve_plots
+
+    cache = open_cache(args)
+    with metrics.timer('plot'):
+        if cache is None:
+            curves = response_curves()
+        else:
+            from .cache import cached_response_curves
+            curves = cached_response_curves(cache)
+    if args.curves:
+        save_response_curves(args.curves)
+    args.rendering.extend(response_curve_plots(curves=curves))
+
+
+def run_pareto(args):
+    # The Pareto front of random diets across all the risk categories, computed once and saved with --front, and the diet
+    # with the lowest weighted risk on it in each range of total grams
+    from .pareto import ParetoFront, pareto_front
+
+    weights = dict(args.weights or [])
+    try:
+        ParetoFront(risk_groups, g_intake_range).weights(weights)
+    except ValueError as error:  # Every risk category weighs 0
+        raise SystemExit(str(error))
+
+    if args.front is not None and os.path.exists(args.front):
+        front = ParetoFront.load(args.front)
+    else:
+        with metrics.timer('pareto'):
+            front = pareto_front(args.tries, sample_bounds, g_intake_range, seed=args.seed, processes=args.processes,
+                                 chunk_size=args.chunk_size, sampler=args.sampler)
+        if args.front is not None:
+            front.save(args.front)
+
+
+    print('\nPareto Front across Ranges ' + str(front.risk_categories))
+    print(g_intake_range)
+    print('Diets on the front in each range', [len(risks) for risks in front.risks])
+    print('\nBest Diets on the Front for the weights ' + str(front.weights(weights).tolist()))
+    print(food_groups)
+    for g in front.query(weights):
+        print(g)
+
+
+def run_score(args):
+    # Score a file of diets in chunks, see food_group_solver.scoring for the file formats
+    from .scoring import score_file
+
+    with metrics.timer('score'):
+        diets = score_file(args.input, args.output, args.categories or risk_groups, chunk_size=args.chunk_size)
+    metrics.count('diets_scored', diets)
+    print('Scored', diets, 'diets into', args.output)
+
+
+def run_serve(args):
+    import asyncio
+    from .server import serve
+
+    where = args.unix if args.unix else '%s:%d' % (args.host, args.port)
+    print('Scoring diets on', where, '(Ctrl+C to stop)')
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, max_batch=args.max_batch, max_wait=args.max_wait / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_uncertainty(args):
+    # The lowest risk random diet of each range of total grams, scored again with an ensemble of perturbed curves, see
+    # food_group_solver.uncertainty
+    from .simulation import draw_diets
+    from .uncertainty import Ensemble, ensemble_bands
+
+    diets = draw_diets(np.random.default_rng(args.seed), args.tries, sample_bounds)
+    for risk_category in args.categories or risk_groups:
+        with metrics.timer('uncertainty'):
+            ensemble = Ensemble(risk_category, args.members, args.relative_error, seed=args.seed)
+            bands = ensemble_bands(ensemble, diets, g_intake_range, args.quantiles)
+        print('\nUncertain Solutions across Ranges ' + risk_category)
+        print(g_intake_range)
+        print(food_groups)
+        print('Quantiles', args.quantiles, 'over', args.members, 'sets of coefficients, with a relative standard deviation of', args.relative_error)
+        for g, band in zip(g_intake_range, bands):
+            if band is None:
+                print(g, None)
+                continue
+            print(g, band['diet'], band['grams_sum'], band['risk'])
+            print('   risk', band['quantiles'], 'lowest risk in range', band['lowest'], 'still the lowest', band['robustness'])
+
+
+def run_benchmark(args):
+    # Benchmarks with fixed diets and seeds, see food_group_solver.benchmark
+    from .benchmark import compare, load_results, run_benchmarks, save_results
+
+    results = run_benchmarks(args.quick, 0 if args.seed is None else args.seed, args.processes)
+    print('\nLargest relative difference from risk()')
+    for way, difference in results['agreement'].items():
+        print(way, difference)
+    print('\nBenchmarks')
+    for name, value in results['results'].items():
+        print(name, value)
+
+    if args.baseline is not None and os.path.exists(args.baseline) and not args.save_baseline:
+        rows = compare(results, load_results(args.baseline), args.threshold)
+        results['comparison'] = rows
+        print('\nCompared with ' + args.baseline)
+        for name, old, value, ratio, regression in rows:
+            print(name, old, value, round(ratio, 3), 'REGRESSION' if regression else '')
+    save_results(args.output, results)
+    if args.save_baseline:
+        save_results(args.baseline, results)
+    if not results['agrees']:
+        raise SystemExit('Some faster ways of scoring diets do not agree with risk()')
+
+
+def run_all(args):
+    run_optimize(args)
+    run_solve(args)
+    run_simulate(args)
+    run_plot(args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='food_group_solver', description='Minimise the risk of diseases by changing the intake of food groups.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    processes = argparse.ArgumentParser(add_help=False)
+    processes.add_argument('--processes', type=int, help='number of processes to use (default: all cores)')
+    processes.add_argument('--seed', type=int, help='random seed, to repeat the same random numbers')
+
+    optimize = argparse.ArgumentParser(add_help=False)
+    optimize.add_argument('--category', default='Hypertension', choices=risk_groups, help='risk category to optimize (default: %(default)s)')
+    optimize.add_argument('--starts', type=int, default=10, help='number of random initial guesses (default: %(default)s)')
+    optimize.add_argument('--band', type=int, nargs=2, metavar=('LOWEST', 'HIGHEST'),
+                          help='keep the total grams of the diets from LOWEST up to below HIGHEST, like a range of total grams')
+
+    solve = argparse.ArgumentParser(add_help=False)
+    solve.add_argument('--categories', nargs='+', choices=risk_groups, help='risk categories to solve (default: all)')
+
+    simulation = argparse.ArgumentParser(add_help=False)
+    simulation.add_argument('--tries', type=positive_int,
+                            help='random diets per risk category (default: %d, or all the diets of an existing --store)' % simulation_tries)
+    simulation.add_argument('--chunk-size', type=int, default=100000, help='random diets per chunk of work (default: %(default)s)')
+    simulation.add_argument('--separate', action='store_true', help='draw separate random diets for each risk category')
+    simulation.add_argument('--store', help='folder to save the random diets in, or to reuse them from when it exists')
+    simulation.add_argument('--plots', action=argparse.BooleanOptionalAction, default=True, help='save the scatter plots (default: on)')
+    simulation.add_argument('--sampler', default='random', choices=['random', 'sobol', 'latin'],
+                            help='draw the diets with random numbers, a Sobol sequence or Latin hypercubes (default: %(default)s)')
+    simulation.add_argument('--tolerance', type=float,
+                            help='stop once the lowest risk of every range has not dropped by more than this over --window chunks')
+    simulation.add_argument('--window', type=int, default=3, help='chunks without improvement to stop after (default: %(default)s)')
+    simulation.add_argument('--trace', help='save the lowest risk of every range after each chunk to this JSON file')
+    simulation.add_argument('--sample-size', type=positive_int, default=10000,
+                            help='random diets kept for the scatter plots (default: %(default)s)')
+    simulation.add_argument('--density-points', type=int, default=100000,
+                            help='draw scatter plots with more points than this as a density plot, which needs a larger --sample-size '
+                                 '(default: %(default)s)')
+
+    refine = argparse.ArgumentParser(add_help=False)
+    refine.add_argument('--refine', action='store_true', help='polish the lowest risk diet of each range with a local search')
+
+    cache = argparse.ArgumentParser(add_help=False)
+    cache.add_argument('--cache', help='folder to keep results in, to reuse them when nothing they depend on has changed')
+    cache.add_argument('--cache-size', type=int, default=1024, help='most megabytes kept in the cache folder (default: %(default)s)')
+
+    report = argparse.ArgumentParser(add_help=False)
+    report.add_argument('--metrics', default='metrics.json', help='JSON file to write the metrics of the run to (default: %(default)s)')
+    report.add_argument('--profile', action='store_true',
+                        help='also count the diets scored and the curves without a risk factor for them (with --processes 1 to count them all)')
+
+    plot = argparse.ArgumentParser(add_help=False)
+    plot.add_argument('--curves', help='also save the response curves of every food group to this .npz file')
+
+    subparsers.add_parser('optimize', parents=[optimize, refine, processes, report], help='lowest risk diets from random initial guesses').set_defaults(function=run_optimize)
+    subparsers.add_parser('solve', parents=[solve, cache, report], help='exact lowest risk diet in each range of total grams').set_defaults(function=run_solve)
+    subparsers.add_parser('simulate', parents=[simulation, refine, cache, processes, report], help='random simulation of diets').set_defaults(function=run_simulate)
+    subparsers.add_parser('plot', parents=[plot, cache, processes, report], help='response curve of each food group for each risk category').set_defaults(function=run_plot)
+    pareto = argparse.ArgumentParser(add_help=False)
+    pareto.add_argument('--tries', type=int, default=1000000, help='random diets to search (default: %(default)s)')
+    pareto.add_argument('--chunk-size', type=int, default=100000, help='random diets per chunk of work (default: %(default)s)')
+    pareto.add_argument('--sampler', default='random', choices=['random', 'sobol', 'latin'], help='how to draw the diets (default: %(default)s)')
+    pareto.add_argument('--front', help='.npz file to save the front in, or to reuse it from when it exists')
+    pareto.add_argument('--weights', nargs='+', type=category_weight, metavar='CATEGORY=WEIGHT',
+                        help='weight of risk categories in the best diet, eg Stroke=2 (default: 1 for each)')
+    subparsers.add_parser('pareto', parents=[pareto, processes, report], help='Pareto front across all the risk categories').set_defaults(function=run_pareto)
+    score = subparsers.add_parser('score', parents=[report], help='risk of every diet in a CSV or .npy file of diets')
+    score.add_argument('input', help='CSV or .npy file with the grams of the 12 food groups of one diet per row')
+    score.add_argument('output', help='CSV or .npy file to write the risk of each diet in each risk category to')
+    score.add_argument('--categories', nargs='+', choices=risk_groups, help='risk categories to score (default: all)')
+    score.add_argument('--chunk-size', type=int, default=100000, help='diets read and scored at a time (default: %(default)s)')
+    score.set_defaults(function=run_score)
+    serve = subparsers.add_parser('serve', parents=[report], help='scoring server for diets sent as JSON over HTTP')
+    serve.add_argument('--host', default='127.0.0.1', help='address to listen on (default: %(default)s)')
+    serve.add_argument('--port', type=int, default=8765, help='port to listen on (default: %(default)s)')
+    serve.add_argument('--unix', help='listen on this Unix socket instead of a port')
+    serve.add_argument('--max-batch', type=int, default=1024, help='most diets scored together (default: %(default)s)')
+    serve.add_argument('--max-wait', type=float, default=2, help='most milliseconds to wait for a batch to fill up (default: %(default)s)')
+    serve.set_defaults(function=run_serve)
+    uncertainty = subparsers.add_parser('uncertainty', parents=[solve, processes, report],
+                                        help='lowest risk diets scored with an ensemble of perturbed curves')
+    uncertainty.add_argument('--tries', type=int, default=100000, help='random diets to search (default: %(default)s)')
+    uncertainty.add_argument('--members', type=int, default=100, help='sets of perturbed coefficients (default: %(default)s)')
+    uncertainty.add_argument('--relative-error', type=float, default=0.01,
+                             help='standard deviation of each coefficient, relative to its fitted value (default: %(default)s)')
+    uncertainty.add_argument('--quantiles', type=float, nargs='+', default=[0.05, 0.5, 0.95], help='quantiles of the risks (default: %(default)s)')
+    uncertainty.set_defaults(function=run_uncertainty)
+    benchmark = subparsers.add_parser('benchmark', parents=[processes, report], help='speed of the evaluation, simulation, optimizer and plots')
+    benchmark.add_argument('--output', default='benchmark.json', help='JSON file to write the results to (default: %(default)s)')
+    benchmark.add_argument('--baseline', default='benchmark-baseline.json', help='JSON file of earlier results to compare with (default: %(default)s)')
+    benchmark.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline instead of comparing with it')
+    benchmark.add_argument('--threshold', type=float, default=0.2, help='how much worse than the baseline counts as a regression (default: %(default)s)')
+    benchmark.add_argument('--quick', action='store_true', help='smaller benchmarks, for a quick check')
+    benchmark.set_defaults(function=run_benchmark)
+    subparsers.add_parser('all', parents=[optimize, solve, simulation, refine, plot, cache, processes, report], help='optimize, solve, simulate and plot').set_defaults(function=run_all)
+
+    args = parser.parse_args(argv)
+    args.rendering = []  # Plots are collected by the commands and all saved together at the end on the process pool
+    metrics.reset()
+    metrics.profile(args.profile)
+    try:
+        args.function(args)
+        if args.rendering:
+            from .plots import render
+            with metrics.timer('render'):
+                render(args.rendering, args.processes)
+            metrics.count('plots', len(args.rendering))
+    finally:
+        metrics.profile(False)
+        metrics.write(args.metrics)
@@ -0,0 +1,435 @@
+# Food Group Solver - risk curves and their evaluation
+#
+# The dose-response curves of each food group for each risk category, and functions to score diets against them.
+# This only needs numpy, so it is quick to import without running any of the solvers, simulations or plots.
+
+import numpy as np
+import re
+
+class Curve:
+    # Dose-response curve of one food group, only valid for grams between low and high.
+    # The equation is a Python expression of the grams g, or None when there is no data for the food group.
+    # It is compiled once and works on single values (None outside the curve) and on arrays (NaN outside the curve).
+    namespace = {'exp': np.exp, 'sqrt': np.sqrt}
+
+    def __init__(self, low, high, equation=None):
+        self.low = low
+        self.high = high
+        self.equation = equation
+        self.function = None if equation is None else eval('lambda g: ' + equation, self.namespace)
+
+    def __repr__(self):
+        return 'Curve(%r, %r, %r)' % (self.low, self.high, self.equation)
+
+    def __call__(self, g):
+        if not isinstance(g, np.ndarray):
+            if self.function is None or not self.low <= g <= self.high:
+                return None
+            return self.function(g)
+
+        values = np.full(g.shape, np.nan)
+        if self.function is not None:
+            inside = (self.low <= g) & (g <= self.high)
+            with np.errstate(all='ignore'):
+                values[inside] = self.function(g[inside].astype(float))
+        return values
+
+    def derivative(self, g):
+        # Slope of the curve at grams g, exact to rounding by taking a tiny complex step through the equation.
+        # It is 0 when there is no data. Where the slope is infinite, like sqrt(g) at 0, the step gives a meaningless
+        # number, so gradient solvers should keep to smooth_low() and above.
+        g = np.asarray(g, dtype=float)
+        if self.function is None:
+            return np.zeros(g.shape)
+        with np.errstate(all='ignore'):
+            slope = self.function(g + 1e-20j).imag / 1e-20
+        return np.nan_to_num(slope, nan=0.0)
+
+    def smooth_low(self, offset=0.01):
+        # Lowest grams from which the slope is finite: low, or low + offset when the slope is infinite at low, like that of
+        # sqrt(g) or g ** g at 0. There the complex step does not agree with the slope just above low.
+        if self.function is None:
+            return self.low
+        at_low, above = self.derivative([self.low, self.low + 1e-8])
+        if np.isfinite(at_low) and abs(at_low - above) <= 1e-4 * max(abs(at_low), 1e-8 * self.high):
+            return self.low
+        return self.low + offset
+
+
+food_groups = ['Whole grains', 'Refined grains', 'Vegetables', 'Fruits', 'Nuts', 'Legumes', 'Eggs', 'Dairy', 'Fish', 'Red meat', 'Processed meat', 'Sugar sweetened beverages']
+risk_groups = ['Mortality', 'Obesity', 'Hypertension', 'Coronary heart disease', 'Stroke', 'Breast Cancer']
+
+# Curves of each risk category, one per food group in the same order as food_groups.
+# Adding a risk category or a food group only needs a new entry here.
+risk_curves = {
+    'Mortality': [
+        # Whole grains, <=110g
+        Curve(0, 110, '1.00000580990638 + 0.0000238899850719038 * g ** 2 - 0.00374056674963493 * g - 0.0000000890378843780931 * g ** 3'),
+
+        # Refined grains, <=150g
+        Curve(0, 150, '0.985636361315474 + 0.0000185026832861545 * g ** 2 + 0.0143775300500745 * exp(-0.0000192653522636716 * g ** 3) - 0.00141334351811906 * g - 0.0000000460635245795147 * g ** 3'),
+
+        # Vegetables, <=626g
+        Curve(0, 626, '1.36938867344676 + 0.000000132388589095935 * g ** 2 + 3.72247513239414E-13 * g ** 4 - 0.000853581602881769 * g - 0.369464440678027 * 0.0879027502225784 ** (0.00000198893916572552 * g ** 2)'),
+
+        # Fruits, <=660
+        Curve(0, 660, '1.0019560148015 + 0.00000292879451127119 * g ** 2 + 1.2592678587415E-15 * g ** 5 - 0.0009371340002682 * g - 0.00000000307365403561747 * g ** 3'),
+
+        # Nuts, <=30
+        Curve(0, 30, '1.00020987682039 + 0.000825326186481716 * g ** 2 + 0.00000000667238935271294 * g ** 5 - 0.0219607029518499 * g - 0.000000486297357945452 * g ** 4'),
+
+        # Legumes, <=165
+        Curve(0, 165, '0.999855716315089 + 6.68630308155721E-11 * g ** 4 - 0.000399836095940305 * g - 0.00000587542916419103 * g ** 2'),
+
+        # Eggs, <=68
+        Curve(0, 68, '0.999707256448726 + 0.00000190698568573183 * g ** 3 - 0.00165259883857732 * g - 0.0000000162295041707926 * g ** 4'),
+
+        # Dairy (milk), <=1040
+        Curve(0, 1040, '0.999991025887482 + 0.000000763238581681405 * g ** 2 - 0.000279840453209451 * g - 0.000000000337555437446477 * g ** 3'),
+
+        # Fish, <= 250
+        Curve(0, 250, '1.00000099297196 + 0.0000122538960153683 * g ** 2 + 8.07418123444118E-11 * g ** 4 - 0.00150028075219509 * g - 0.0000000527492780778534 * g ** 3'),
+
+        # Red meat, <=200
+        Curve(0, 200, '1 + 0.00156812805472349*g + 0.00000270380002821566*g**2'),
+
+        # Processed meat, <=200
+        Curve(0, 200, '1.00015688670152 + 0.00490940742143424*g + 0.000000246422645637702*g**3 - 0.000000000511880150476138*g**4 - 0.0000391239724529405*g**2'),
+
+        # Sugar sweetened beverages, <=200
+        Curve(0, 305, '1.00015688670152 + 0.00490940742143424*g + 0.000000246422645637702*g**3 - 0.000000000511880150476138*g**4 - 0.0000391239724529405*g**2'),
+    ],
+    'Obesity': [
+        # Whole grains, <=110g
+        Curve(0, 221, '1.0000507675119 + 0.000050767498336214*g**2 + 0.000000000493243276468996*g**4 - 0.00488518426603843*g - 0.00000026576372246833*g**3'),
+
+        # Refined grains, <=150g
+        Curve(0, 170, '0.999370812052337 + 0.000000886797513048484*g**3 + 1.82744494474372E-11*g**5 - 0.00147110638598328*g - 0.0000000073612857181474*g**4'),
+
+        # Vegetables, <=492g
+        Curve(0, 492, '0.999848350430688 + 0.0000000113432902532356*g**3 + 7.36028106705123E-18*g**6 - 0.000244845332136479*g - 1.48468179795039E-11*g**4 - 0.00000196189477663018*g**2'),
+
+        # Fruits, <=660
+        Curve(0, 280, '1.00085346356918 + 0.0000000104776286111904*g**3 - 0.000913815389460958*g - 1.89664347828468E-11*g**4'),
+
+        # Nuts, <=30
+        Curve(0, 29, '1 + 0.00165436491560647*g**2 + 0.0000000086265608483863*g**5 + 0.0720194780061728*g*0.252832866921258**g - 0.0174759216532096*g - 0.0000399733746993413*g**3'),
+
+        # Legumes, <=165
+        Curve(0, 165),
+
+        # Eggs, <=68
+        Curve(0, 68),
+
+        # Dairy (milk), <=1040
+        Curve(0, 718, '1 + 0.000218394224261435*g + 6.93564849812325E-16*g**5 - 6.1467373735473E-22*g**7 - 0.000000474013012661195*g**2'),
+
+        # Fish, <= 250
+        Curve(0, 86, '1.0000282566737 + 0.0000781762665229839*g**2 - 0.00780572047322109*g - 2.01269620726413E-11*g**5'),
+
+        # Red meat, <=200
+        Curve(0, 192, '0.999997233752634 + 0.000602091052884808*g + 0.0000000332925602391651*g**3 - 9.86163423413665E-11*g**4'),
+
+        # Processed meat, <=200
+        Curve(0, 200),
+
+        # Sugar sweetened beverages, <=200
+        Curve(0, 963, '1.0002377520112 + 0.000196223140212869*g + 8.59994959848606E-14*g**4 - 0.000000000129011764070023*g**3'),
+    ],
+    'Hypertension': [
+        # Whole grains, <=110g
+        Curve(0, 92, '1.00000839487255 + 0.00000157693869195293*g**3 + 9.45220984653665E-11*g**5 - 0.00422714671099191*g - 0.0000000224824140499732*g**4'),
+
+        # Refined grains, <=150g
+        Curve(0, 150, '1.00005950150556 + 0.000000173681689025758*g**3 + 1.38179328242953E-16*g**7 - 0.00124308622842593*g - 7.91888079505494E-12*g**5'),
+
+        # Vegetables, <=492g
+        Curve(0, 512, '1.0000012067723 + 7.38173813347707E-12*g**4 + 1.80863521061378E-17*g**6 - 0.000122094069700771*g - 2.20922076838462E-14*g**5'),
+
+        # Fruits, <=660
+        Curve(0, 360, '1.00365358895194 + 0.00000189481674872686*g**2 - 0.000657022094849668*g - 0.00000000175371758439632*g**3 - 0.00365829691802639*0.946692418883592**g'),
+
+        # Nuts, <=30
+        Curve(0, 37, '0.931658683373132 + 0.00899492979473475*sqrt(g) + 0.0683253474343096*0.822462562947873**g - 0.00374081960262853*g'),
+
+        # Legumes, <=165
+        Curve(0, 71, '1.00012594843061 + 0.000205361227985139*g + 0.000000000400007616940544*g**5 - 2.14968155917602E-12*g**6 - 0.0000000205148976576964*g**4'),
+
+        # Eggs, <=68
+        Curve(0, 68),
+
+        # Dairy (milk), <=1040
+        Curve(0, 798, '1.00102728216276 + 0.000000247933994310627*g**2 - 0.000345064658146077*g - 7.08420724615039E-14*g**4'),
+
+        # Fish, <= 250
+        Curve(0, 156, '0.999935690980483 + 0.00204987783955615*g + 0.0000000020732706104165*g**4 - 5.08376617472772E-12*g**5 - 0.000000242147056819231*g**3 - 0.00000387300938657444*g**2'),
+
+        # Red meat, <=200
+        Curve(0, 200, '0.999995239003885 + 0.00156902702239434*g + 0.00000263946542770723*g**2'),
+
+        # Processed meat, <=200
+        Curve(0, 39, '0.999950837798111 + 0.00506900719557049*g + 0.00000020217817909935*g**4 - 0.0000000014759722062014*g**5 - 0.00000803001890549513*g**3'),
+
+        # Sugar sweetened beverages, <=200
+        Curve(0, 456, '1.00002470469514 + 0.000231931045409478*g + 0.000000109723482486383*g**2'),
+    ],
+    'Coronary heart disease': [
+        # Whole grains, <=110g
+        Curve(0, 223, '1.00045874331912 + 0.0000199975907171993*g**2 + 1.25297934670593E-15*g**6 - 0.00351364848060547*g - 0.000000000207819780242973*g**4'),
+
+        # Refined grains, <=150g
+        Curve(0, 220, '1.00019621318546 + 0.0000000268716936354801*g**3 - 0.000332303129394859*g - 4.42891253032498E-21*g**8'),
+
+        # Vegetables, <=492g
+        Curve(0, 549, '0.999968307307653 + 0.00000000422175590229631*g**3 + 5.3908374442433E-18*g**6 - 0.000540102790488367*g - 7.49072914860986E-12*g**4'),
+
+        # Fruits, <=660
+        Curve(0, 613, '1.13381318595577 + 0.00000241242886039687*g**2 - 0.00155922095504886*g - 1.47771376953214E-12*g**4 - 0.079022780413264*(0.87707893992527 + 0.0000000145723165173864*g**3)**(-3.97816899649496)'),
+
+        # Nuts, <=30
+        Curve(0, 28, '0.999728098996545 + 0.00164196869051811*g**2 + 3.09743673861905E-11*g**7 - 0.0362646804322598*g - 0.0000000483030194380726*g**5'),
+
+        # Legumes, <=165
+        Curve(0, 269, '1.00068015060988 + 0.000011518689002265*g**2 + 4.32551275270271E-16*g**6 - 0.00217117936477782*g - 9.43723494091897E-11*g**4'),
+
+        # Eggs, <=68
+        Curve(0, 75, '1.00000419395789 + 0.000276907388715002*sqrt(g) + 0.00000956103185622741*g**2 - 0.0000000469769556746469*g**3'),
+
+        # Dairy (milk), <=1040
+        Curve(0, 703, '0.999960641464613 + 0.00000000131375353919311*g**3 + 4.02609146523967E-21*g**7 - 0.000278071522207741*g - 4.58765948674084E-18*g**6'),
+
+        # Fish, <= 250
+        Curve(0, 317, '0.945109863241359 + 2.34819521559233E-13*g**4 + 0.0544254002196295*g**(-0.0146771655195789*g) - 0.000372978651365398*g'),
+
+        # Red meat, <=200
+        Curve(0, 100, '1 + 0.00000107877854879899*g**3 - 0.00128860386567646*g - 0.00000000532859003128846*g**4 - 0.000027595184894278*g**2'),
+
+        # Processed meat, <=200
+        Curve(0, 33, '0.999742525315079 + 0.00994530498234875*g + 0.00000457822018822179*g**3 - 0.000353844884793033*g**2'),
+
+        # Sugar sweetened beverages, <=200
+        Curve(0, 650, '1.00003460032796 + 0.00050156299128057*g + 0.000000472280449363417*g**2 - 0.000000000168024741983963*g**3'),
+    ],
+    'Stroke': [
+        # Whole grains, <=110g
+        Curve(0, 688, '0.810689608671801 + 0.000303540959186707*g + 0.190700456910961*0.991151967206131**g + 0.000000019319202827936*0.991151967206131**g*g**3'),
+
+        # Refined grains, <=150g
+        Curve(0, 312, '1.00039399940037 + 0.000000260679238179467*g**2 - 0.000145761704124746*g - 6.58820576349195E-13*g**4'),
+
+        # Vegetables, <=492g
+        Curve(0, 407, '1.00016574776358 + 0.0000000250769907006448*g**3 + 7.71737893026194E-14*g**5 - 0.00101592534661781*g - 8.086957575042E-11*g**4'),
+
+        # Fruits, <=660
+        Curve(0, 423, '1.0018680303821 + 0.000011006234493039*g**2 + 1.5562871894236E-14*g**5 - 0.00255112776940949*g - 0.0000000171392032789185*g**3'),
+
+        # Nuts, <=30
+        Curve(0, 30, '1.00099312875435 + 0.000902764274951303*g**2 - 0.0133568189698753*g - 0.0000122141905407157*g**3'),
+
+        # Legumes, <=165
+        Curve(0, 79, '0.999999765613346 + 0.00095139637535958*g + 0.0000000918053912528551*g**3 + 1.20571019919927E+21*g*0.0000125419822022436**g - 0.00181302750217015*sqrt(g) - 0.0000206862546753395*g**2'),
+
+        # Eggs, <=68
+        Curve(0, 75, '1.00049989350103 + 0.0000346899919357074*g**2 - 0.00193005298214417*g - 0.00000000133660261910152*g**4'),
+
+        # Dairy (milk), <=1040
+        Curve(0, 1004, '1.00016683478597 + 0.000000000744687416673434*g**3 + 3.57806476720974E-16*g**5 - 0.000189596499732402*g - 9.46337984825463E-13*g**4'),
+
+        # Fish, <= 250
+        Curve(0, 126, '1.00401625799537 + 0.0000442744032278346*g**2 + 3.00939350364819E-12*g**5 - 0.00334833739527139*g - 0.000000252917933276324*g**3 - 0.00401354788015853*0.760051485211053**g'),
+
+        # Red meat, <=200
+        Curve(0, 195, '1.00001650799274 + 0.000996845007109223*g + 0.00000161653824559303*g**2 - 0.00000000192214970331105*g**3'),
+
+        # Processed meat, <=200
+        Curve(0, 84, '0.999208246731238 + 0.00538441288935898*g + 0.0000000384613303689653*g**4 - 0.000000000179099939230268*g**5 - 0.0000024400284334768*g**3'),
+
+        # Sugar sweetened beverages, <=200
+        Curve(0, 624, '1.00004416212234 + 0.000233457185414672*g + 0.000000185146656452008*g**2 - 1.02622727140244E-13*g**4'),
+    ],
+    'Breast Cancer': [
+        # Whole grains, <=110g
+        Curve(0, 688),
+
+        # Refined grains, <=150g
+        Curve(0, 244, '0.999647784427458 + 0.000000166694062503251*g**3 + 1.08713384881896E-12*g**5 - 0.000699253060068376*g - 0.000000000738341463966824*g**4 - 0.00000994065167271397*g**2'),
+
+        # Vegetables, <=492g
+        Curve(0, 499, '1.01511584428115 + 0.0000015186792841574*g**2 + 8.69589871944779E-16*g**5 - 0.000512594578597604*g - 0.00000000168767912276405*g**3 - 0.0151697727479217*0.972167217399176**g'),
+
+        # Fruits, <=660
+        Curve(0, 459, '1.00006340105495 + 0.00000000720966272977647*g**3 + 7.94592608012118E-15*g**5 - 0.000182781417604044*g - 1.33157255770679E-11*g**4 - 0.000000894226320882383*g**2'),
+
+        # Nuts, <=30
+        Curve(0, 30),
+
+        # Legumes, <=165
+        Curve(0, 79),
+
+        # Eggs, <=68
+        Curve(0, 43, '0.999964288907252 + 0.00211373128406166*g + 0.00581152260341498*g*0.000016902179217457**(0.01182312980931*g) + 0.00145483201246028*g**2*0.000016902179217457**(0.01182312980931*g) - 0.000000576478821976537*g**3'),
+
+        # Dairy (milk), <=1040
+        Curve(0, 819, '1.00322826507111 + 0.0000000664767527395768*g**2 + 0.000073763722326998*g*0.0000354349549695938**(0.00000000472207324027457*g**3) + 0.0000522585645963408*g*0.0000354349549695938**(0.00000000236103662013729*g**3) - 0.000118400064108107*g - 0.00322826271007215*0.000073763722326998**g'),
+
+        # Fish, <= 250
+        Curve(0, 819, '1.00010797228407 + 0.00134496071008393*g + 0.000159292442456716*g**2 + 0.00195053292245334*g*0.000259456009125647**(0.0141502139014468*g) - 0.0578172708592872*0.000135749756567022**(0.000259456009125647**(0.0141502139014468*g)) - 0.000157036190219262*g**2*0.000135749756567022**(0.000259456009125647**(0.0141502139014468*g))'),
+
+        # Red meat, <=200
+        Curve(0, 151, '0.994888397567691 + 0.000000142760123943435*g**3 + 0.0026604091075011*sqrt(3.68718917416408 + g**2) - 1.20623098950862E-12*g**5 - 0.0000298546670448722*g**2'),
+
+        # Processed meat, <=200
+        Curve(0, 56, '0.999965782329385 + 0.00818021596278548*g + 0.000039104905338513*g**2 + 0.000000207668790492212*g**3 - 0.466304655775947*g*sqrt(0.00000703645687717201*g)'),
+
+        # Sugar sweetened beverages, <=200
+        Curve(0, 624),
+    ],
+}
+
+def compile_curves(curves):
+    # Compile all the curves of a risk category into a single function of the grams of every food group,
+    # returning a list with each risk factor or None. This avoids any per-curve dispatch in risk().
+    terms = []
+    for index, curve in enumerate(curves):
+        g = 'g%d' % (index + 1)
+        if curve.equation is None:
+            terms.append('None')
+        else:
+            terms.append('(%s) if %r <= %s <= %r else None' % (re.sub(r'\bg\b', g, curve.equation), curve.low, g, curve.high))
+    arguments = ', '.join('g%d' % (index + 1) for index in range(len(food_groups)))
+    return eval('lambda %s: [%s]' % (arguments, ', '.join(terms)), Curve.namespace)
+
+risk_functions = {}  # Compiled curves of each risk category, filled in by risk() on first use
+evaluation_hook = None  # When set, eg by metrics.profile(), called with the risk categories and diets scored by risk(), risk_batch() and risk_matrix()
+
+def risk(risk_category, grams):
+    # print(grams)
+    if risk_category not in risk_functions:
+        risk_functions[risk_category] = compile_curves(risk_curves.get(risk_category, []))
+    if evaluation_hook is not None:
+        evaluation_hook([risk_category], [grams])
+    final = list(filter(None, risk_functions[risk_category](*grams)))  # Remove any None values
+    return final
+
+risk_tables = {}  # Risk factors of each risk category for every whole number of grams, filled in by risk_table() on first use
+
+def risk_table(risk_category):
+    # Table of the risk factors of each food group for 0, 1, 2 ... up to the highest grams of any curve in the risk category,
+    # shaped (12, highest grams + 1) with NaN where there is no curve or the grams are outside its range.
+    # The values come from the curves on whole grams, so they are exactly the same numbers risk() gives.
+    if risk_category not in risk_tables:
+        curves = risk_curves.get(risk_category, [])
+        highest_grams = max([int(curve.high) for curve in curves], default=0)
+        table = np.full((len(food_groups), highest_grams + 1), np.nan)
+        for index, curve in enumerate(curves):
+            for g in range(highest_grams + 1):
+                factor = curve(g)
+                if factor:  # Like filter(None, ...) in risk()
+                    table[index, g] = factor
+        risk_tables[risk_category] = table
+    return risk_tables[risk_category]
+
+def risk_batch(risk_category, grams_matrix):
+    # Same as risk() for many diets at once. grams_matrix is an (N, 12) array with one diet per row.
+    # Returns the (N, 12) risk factors, NaN where there is no curve or the grams are outside its range,
+    # and the (N,) average risk of each diet, which matches average(risk(risk_category, diet)).
+    # Diets in whole grams are looked up in risk_table(), anything else (eg optimizer output) uses the curves.
+    grams_matrix = np.atleast_2d(np.asarray(grams_matrix))
+    if evaluation_hook is not None:
+        evaluation_hook([risk_category], grams_matrix)
+
+    if np.issubdtype(grams_matrix.dtype, np.integer) or np.array_equal(grams_matrix, np.round(grams_matrix)):
+        table = risk_table(risk_category)
+        inside = (0 <= grams_matrix) & (grams_matrix < table.shape[1])
+        factors = table[np.arange(table.shape[0]), np.where(inside, grams_matrix, 0).astype(np.intp)]
+        factors[~inside] = np.nan
+    else:
+        grams_matrix = grams_matrix.astype(float)
+        factors = np.full(grams_matrix.shape, np.nan)
+        for index, curve in enumerate(risk_curves.get(risk_category, [])):
+            factors[:, index] = curve(grams_matrix[:, index])
+        factors[factors == 0] = np.nan  # filter(None, ...) in risk() drops zero factors too
+
+    return factors, average_defined(factors)
+
+def average_defined(factors):
+    # Average of each row of a 2-D array over the values that are not NaN, or NaN if there are none
+    with np.errstate(all='ignore'):
+        defined = ~np.isnan(factors)
+        return np.where(defined, factors, 0).sum(axis=1) / defined.sum(axis=1)
+
+
+risk_matrix_tables = {}  # risk_table() of several risk categories stacked into one array, filled in by risk_matrix()
+combined_category = 'Combined'  # Name of the average risk over all the risk categories
+
+def risk_matrix(risk_categories, grams_matrix):
+    # Average risk of many diets for several risk categories in one pass, as an (N, len(risk_categories)) array with one
+    # column per risk category that matches the average risk of risk_batch(). Diets in whole grams look up all the
+    # risk tables at once with the same indexes, anything else goes through risk_batch() for each category.
+    grams_matrix = np.atleast_2d(np.asarray(grams_matrix))
+    if not (np.issubdtype(grams_matrix.dtype, np.integer) or np.array_equal(grams_matrix, np.round(grams_matrix))):
+        return np.stack([risk_batch(risk_category, grams_matrix)[1] for risk_category in risk_categories], axis=1)
+    if evaluation_hook is not None:
+        evaluation_hook(risk_categories, grams_matrix)
+
+    key = tuple(risk_categories)
+    if key not in risk_matrix_tables:
+        tables = [risk_table(risk_category) for risk_category in risk_categories]
+        stacked = np.full((len(tables), len(food_groups), max(table.shape[1] for table in tables)), np.nan)
+        for position, table in enumerate(tables):
+            stacked[position, :, :table.shape[1]] = table
+        risk_matrix_tables[key] = stacked
+    stacked = risk_matrix_tables[key]
+
+    inside = (0 <= grams_matrix) & (grams_matrix < stacked.shape[2])
+    factors = stacked[:, np.arange(stacked.shape[1]), np.where(inside, grams_matrix, 0).astype(np.intp)]  # (categories, N, 12)
+    factors[:, ~inside] = np.nan
+    return np.stack([average_defined(category_factors) for category_factors in factors], axis=1)
+
+def combined_risk(risks):
+    # Average of the risks of each diet (row) over the risk categories (columns) that could be scored
+    return average_defined(risks)
+
+
+response_grid = np.arange(0, 500)  # Grams of each food group on its own in the response curve plots
+response_cache = {}  # Arrays of response_curves(), filled in on first use of each grid and list of risk categories
+
+def response_curves(grid=response_grid, risk_categories=risk_groups):
+    # Risk factor of every food group for every risk category on the same grams, as a (categories, 12, len(grid)) array
+    # with NaN where there is no curve or the grams are outside its range. Each value is the risk of a diet with only that
+    # food group, so it is the same number risk() gives. The array is shared between calls, so it is read only.
+    grid = np.asarray(grid)
+    key = (tuple(risk_categories), grid.dtype.str, grid.tobytes())
+    if key not in response_cache:
+        diets = np.repeat(grid[:, np.newaxis], len(food_groups), axis=1)  # Every food group at every grams of the grid
+        curves = np.stack([risk_batch(risk_category, diets)[0].T for risk_category in risk_categories])
+        curves.flags.writeable = False
+        response_cache[key] = curves
+    return response_cache[key]
+
+def save_response_curves(path, grid=response_grid, risk_categories=risk_groups):
+    # Save response_curves() in a single .npz file with its grid and the names of the risk categories and food groups
+    np.savez(path, curves=response_curves(grid, risk_categories), grid=np.asarray(grid),
+             risk_groups=np.array(risk_categories), food_groups=np.array(food_groups))
+
+def load_response_curves(path):
+    # Read a file from save_response_curves(), returning the curves, the grid and the list of risk categories
+    with np.load(path) as data:
+        return data['curves'], data['grid'], data['risk_groups'].tolist()
+
+# Range of grams sampled for each food group, in the same order as food_groups. The highest value is excluded, as in random.randint
+sample_bounds = [
+    (75, 221),  # Whole grains, <=110g
+    (0, 90),  # Refined grains, <=150g
+    (150, 550),  # Vegetables, <=626g
+    (200, 350),  # Fruits, <=660
+    (10, 37),  # Nuts, <=30
+    (60, 165),  # Legumes, <=165
+    (0, 50),  # Eggs, <=68
+    (150, 350),  # Dairy, <=1040
+    (0, 250),  # Fish, <= 250
+    (0, 65),  # Red meat, <=200
+    (0, 12),  # Processed meat, <=200
+    (0, 12),  # Sugar sweetened beverages, <=200
+]
+g_intake_range = [(750, 1000), (1000, 1250), (1250, 1500), (1500, 1750), (1750, 2000), (2000, 2250), (2250, 2500), (2500, 2750), (2750, 3000)]
@@ -0,0 +1,102 @@
+# Food Group Solver - metrics
+#
+# Where the time of a run goes and what happened in it: a timer for each phase (optimize, solve, simulate, render ...),
+# counters, results such as the number of random diets that fell in each range of total grams, and, when profiling is on,
+# how many diets each risk category scored and how often each curve gave no risk factor because the grams were outside it
+# (or it was 0), which risk() drops without a trace. The command line writes it all to a JSON report at the end of a run.
+#
+# Profiling hooks into the evaluation of the curves in this process, so it does not see diets scored in other processes
+# of a pool (use --processes 1 to count them all). Without profiling the only cost is one check per call.
+
+import json
+import numpy as np
+import time
+
+from contextlib import contextmanager
+
+from . import core
+from .core import food_groups, risk_curves, risk_table
+
+class Metrics:
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.phases = {}  # Seconds spent in each phase
+        self.counters = {}
+        self.sections = {}  # Other results of the run, eg 'simulation'
+        self.evaluations = {}  # Calls and diets scored for each risk category, while profiling
+        self.domain_misses = {}  # Evaluations of each curve that gave no risk factor, while profiling
+
+    @contextmanager
+    def timer(self, phase):
+        # Add the time spent in the with block to phase
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] = self.phases.get(phase, 0.0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, section, values):
+        self.sections[section] = values
+
+    def profile(self, enabled=True):
+        # Count every diet scored in this process, and the curves that gave no risk factor, until profile(False)
+        core.evaluation_hook = self.evaluated if enabled else None
+
+    def evaluated(self, risk_categories, grams_matrix):
+        grams = np.asarray(grams_matrix, dtype=float)
+        whole = grams == np.round(grams)
+        for risk_category in risk_categories:
+            calls, diets = self.evaluations.get(risk_category, (0, 0))
+            self.evaluations[risk_category] = (calls + 1, diets + len(grams))
+
+            curves = risk_curves.get(risk_category, [])
+            has_curve = np.array([curve.equation is not None for curve in curves])
+            lows = np.array([curve.low for curve in curves])
+            highs = np.array([curve.high for curve in curves])
+            outside = (grams < lows) | (grams > highs)
+            table = risk_table(risk_category)
+            looked_up = whole & ~outside & (grams < table.shape[1])
+            zero = np.zeros(grams.shape, dtype=bool)
+            zero[looked_up] = np.isnan(table[np.nonzero(looked_up)[1], grams[looked_up].astype(np.intp)])
+            misses = (has_curve & (outside | zero)).sum(axis=0)
+            counts = self.domain_misses.setdefault(risk_category, [0] * len(food_groups))
+            for index, miss in enumerate(misses.tolist()):
+                counts[index] += miss
+
+    def report(self):
+        # Everything measured so far as a dict that can be saved as JSON
+        report = {'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)), 'seconds': time.time() - self.started,
+                  'phases': dict(self.phases), 'counters': dict(self.counters)}
+        report.update(self.sections)
+        if self.evaluations:
+            report['evaluations'] = {risk_category: {'calls': calls, 'diets': diets} for risk_category, (calls, diets) in self.evaluations.items()}
+            report['domain_misses'] = {risk_category: dict(zip(food_groups, counts)) for risk_category, counts in self.domain_misses.items()}
+        return report
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=1)
+
+metrics = Metrics()  # Metrics of the current run, used by the command line
+
+def simulation_metrics(simulations, g_intake_range, seconds):
+    # Diets scored, diets per second and the share of diets in each range of total grams (and in none) of each risk category
+    # of the results of simulate(), which took seconds
+    values = {}
+    for risk_category, simulation in simulations.items():
+        stats = simulation['stats']
+        values[risk_category] = {
+            'diets': stats.count,
+            'diets_per_second': stats.count / seconds if seconds else None,
+            'range_hits': dict(zip([str(g) for g in g_intake_range], stats.range_counts)),
+            'range_hit_rate': dict(zip([str(g) for g in g_intake_range], [count / stats.count if stats.count else None for count in stats.range_counts])),
+            'outside_ranges': stats.count - sum(stats.range_counts),
+        }
+    return values
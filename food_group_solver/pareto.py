@@ -0,0 +1,133 @@
+# Food Group Solver - Pareto front
+#
+# Instead of the lowest risk diet of each risk category on its own, which contradict each other, the diets of each range of
+# total grams that no other diet beats in every risk category at once. Any weighting of the risk categories then picks its
+# best diet from this front, without scoring the random diets again.
+
+import json
+import numpy as np
+
+from .core import food_groups, risk_groups, risk_matrix
+from .simulation import draw_diets, intake_range_index, run_chunks
+
+def non_dominated(risks, block=32):
+    # Indexes of the rows of an (N, categories) array of risks that no other row dominates, that is has a risk as low in
+    # every category and lower in one. Of rows with the same risks only the first is kept. A row can only be dominated by a
+    # row with a smaller total, so going up the totals, each row left is on the front and removes every row it dominates.
+    # The rows left are only packed together after each block of rows, as that copy costs more than the comparisons.
+    risks = np.asarray(risks, dtype=float)
+    remaining = np.argsort(risks.sum(axis=1), kind='stable')
+    columns = risks[remaining].T.copy()  # One row per risk category, so each comparison runs over contiguous memory
+    front = []
+    while len(remaining):
+        dominated = np.zeros(len(remaining), dtype=bool)
+        for row in range(min(block, len(remaining))):
+            if dominated[row]:
+                continue
+            front.append(remaining[row])
+            covered = columns[0] >= columns[0, row]
+            for column in columns[1:]:
+                covered &= column >= column[row]
+            dominated |= covered
+        remaining = remaining[~dominated]
+        columns = columns[:, ~dominated]
+    return np.array(front, dtype=np.intp)
+
+class ParetoFront:
+    # The non-dominated diets of each range of g_intake_range, with their risk in each of risk_categories, updated with whole
+    # chunks of diets at a time. Diets without a risk in some risk category cannot be compared, so they are left out.
+
+    def __init__(self, risk_categories, g_intake_range):
+        self.risk_categories = list(risk_categories)
+        self.g_intake_range = g_intake_range
+        self.diets = [np.empty((0, len(food_groups)), dtype=int) for g in g_intake_range]
+        self.risks = [np.empty((0, len(self.risk_categories))) for g in g_intake_range]
+
+    def add(self, diets, risks, range_index=None):
+        # Add an (N, 12) array of diets with their (N, categories) risks, eg from risk_matrix().
+        # range_index is the intake_range_index() of the diets, if already known.
+        diets = np.atleast_2d(np.asarray(diets))
+        risks = np.atleast_2d(np.asarray(risks, dtype=float))
+        if range_index is None:
+            range_index = intake_range_index(diets.sum(axis=1), self.g_intake_range)
+        index = np.where(np.isnan(risks).any(axis=1), -1, range_index)
+        for band in range(len(self.g_intake_range)):
+            rows = np.flatnonzero(index == band)
+            if len(rows):
+                self.keep(band, diets[rows], risks[rows])
+
+    def merge(self, other):
+        # Add the front of another ParetoFront over the same risk categories and ranges
+        for band in range(len(self.g_intake_range)):
+            if len(other.risks[band]):
+                self.keep(band, other.diets[band], other.risks[band])
+
+    def keep(self, band, diets, risks):
+        diets = np.concatenate([self.diets[band], diets])
+        risks = np.concatenate([self.risks[band], risks])
+        kept = non_dominated(risks)
+        self.diets[band] = diets[kept]
+        self.risks[band] = risks[kept]
+
+    def weights(self, weights):
+        # Weight of each risk category from a dict of {risk category: weight} where any risk
+        # category left out weighs 1, or a list with a weight for each risk category
+        if isinstance(weights, dict):
+            unknown = set(weights) - set(self.risk_categories)
+            if unknown:
+                raise ValueError('unknown risk categories %s, expected some of %s' % (sorted(unknown), self.risk_categories))
+            weights = [weights.get(risk_category, 1) for risk_category in self.risk_categories]
+        weights = np.asarray(weights, dtype=float)
+        if len(weights) != len(self.risk_categories) or (weights < 0).any() or not weights.sum() > 0:
+            raise ValueError('weights must be one positive or zero number for each of %s' % self.risk_categories)
+        return weights
+
+    def query(self, weights=None):
+        # The diet with the lowest weighted average risk in each range as [diet, grams_sum, weighted risk], or [None, 2] if
+        # the range has no diets, like the 'g_vars' of simulate(). With positive weights this is the lowest weighted risk of
+        # every diet added, not only of the front. Equal weights (the default) give the combined risk.
+        weights = self.weights([1] * len(self.risk_categories) if weights is None else weights)
+        solutions = []
+        for diets, risks in zip(self.diets, self.risks):
+            if len(risks):
+                weighted = (risks * weights).sum(axis=1) / weights.sum()
+                best = int(np.argmin(weighted))
+                solutions.append([diets[best].tolist(), int(diets[best].sum()), float(weighted[best])])
+            else:
+                solutions.append([None, 2])
+        return solutions
+
+    def save(self, path):
+        # Save the front in a single .npz file, read back with ParetoFront.load()
+        arrays = {'counts': np.array([len(risks) for risks in self.risks]), 'diets': np.concatenate(self.diets), 'risks': np.concatenate(self.risks)}
+        np.savez(path, settings=np.array(json.dumps({'risk_categories': self.risk_categories, 'g_intake_range': self.g_intake_range})), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            settings = json.loads(str(data['settings']))
+            front = cls(settings['risk_categories'], [tuple(g) for g in settings['g_intake_range']])
+            bounds = np.cumsum(data['counts'])[:-1]
+            front.diets = np.split(data['diets'], bounds)
+            front.risks = np.split(data['risks'], bounds)
+        return front
+
+def pareto_chunk(risk_categories, samples, bounds, g_intake_range, seed_sequence, sampler='random', start=0, design_seed=None):
+    # ParetoFront of one chunk of samples diets within bounds, scored for all risk_categories at once
+    diets = draw_diets(np.random.default_rng(seed_sequence), samples, bounds, sampler, start, design_seed)
+    front = ParetoFront(risk_categories, g_intake_range)
+    front.add(diets, risk_matrix(risk_categories, diets))
+    return front
+
+def pareto_front(random_tries, bounds, g_intake_range, risk_categories=risk_groups, seed=None, processes=None, chunk_size=100000, sampler='random'):
+    # ParetoFront of random_tries diets within bounds, drawn as in simulate(shared=True) so a seed gives the same diets, and
+    # scored in chunks of chunk_size diets on up to processes cores (default all, 1 runs here without a pool)
+    chunk_sizes = [chunk_size] * (random_tries // chunk_size) + ([random_tries % chunk_size] if random_tries % chunk_size else [])
+    seed_sequence = np.random.SeedSequence(seed)
+    tasks = [(risk_categories, samples, bounds, g_intake_range, chunk_seed, sampler, chunk_size * chunk, seed_sequence)
+             for chunk, (samples, chunk_seed) in enumerate(zip(chunk_sizes, seed_sequence.spawn(len(chunk_sizes))))]
+
+    front = ParetoFront(risk_categories, g_intake_range)
+    for chunk in run_chunks(pareto_chunk, tasks, processes, lambda task: True):
+        front.merge(chunk)
+    return front
@@ -0,0 +1,76 @@
+# Food Group Solver - plots
+#
+# Scatter plots of the random simulation and the response curve of each food group, saved as PNG files.
+# Figures are made without pyplot, so no windows are opened and each figure is freed once saved, and the PNG files
+# are rendered in parallel on a process pool.
+
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+
+from .core import food_groups, response_curves, response_grid, risk_groups
+
+density_points = 100000  # Scatter plots with more points than this are drawn as a density of points instead
+
+
+def save_scatter(filename, x, y, title, ylabel, xlabel, line=None, text=None, density_points=density_points):
+    # Save a scatter plot of y against x, or a hexbin density plot when there are more than density_points points,
+    # with an optional (m, b) line y = m*x + b and text in the top left corner
+    figure = Figure()
+    axes = figure.subplots()
+    if len(x) > density_points:
+        axes.hexbin(x, y, gridsize=100, bins='log', mincnt=1)
+    else:
+        axes.scatter(x, y, s=1)
+    if line is not None:
+        m, b = line
+        axes.plot(x, m*x + b, color='r')
+    if text is not None:
+        axes.text(0.05, 0.95, text, transform=axes.transAxes)
+    axes.set_title(title)
+    axes.set_ylabel(ylabel)
+    axes.set_xlabel(xlabel)
+    figure.savefig(filename)
+
+
+def render(plots, processes=None):
+    # Save each plot, given as the arguments of save_scatter(), on up to processes cores (1 renders here without a pool)
+    if processes == 1:
+        for plot in plots:
+            save_scatter(*plot)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            list(executor.map(save_scatter, *zip(*plots)))
+
+
+def simulation_plot(risk_category, stats, equation, density_points=density_points):
+    # Scatter plot of the random sample of diets in the RunningStats of a simulation with its linear fit and equation,
+    # as arguments of save_scatter() for '<risk category> Risk.png'
+    fit = stats.fit()
+    line = None if fit is None else fit[:2]  # m = slope, b = intercept
+    return (risk_category + ' Risk.png', stats.sample_grams, stats.sample_risk, risk_category, 'Risk ' + risk_category, 'kcal',
+            line, equation, density_points)
+
+
+def response_curve_plots(risk_categories=risk_groups, grid=response_grid, curves=None):
+    # Risk of each food group on its own across the grams of the grid, as arguments of save_scatter() for
+    # '<food group> <risk category> Risk.png'. curves is the response_curves() of the grid, if already known.
+    if curves is None:
+        curves = response_curves(grid, risk_categories)
+    plots = []
+    for position, risk_category in enumerate(risk_categories):  # eg 'Mortality', 'Obesity' ...
+        for index, food_group in enumerate(food_groups):  # eg 'Whole grains', 'Refined grains' ...
+            print('\n' + food_group)
+            print(risk_category + ': ' + food_group + ' across intakes of g')
+            plots.append((food_group + ' ' + risk_category + ' Risk.png', grid, curves[position, index], risk_category + ': ' + food_group,
+                          'Risk ' + risk_category, 'grams'))
+    return plots
+
+
+def plot_simulation(risk_category, stats, equation, density_points=density_points):
+    # Save the scatter plot of a simulation as '<risk category> Risk.png'
+    save_scatter(*simulation_plot(risk_category, stats, equation, density_points))
+
+
+def plot_response_curves(risk_categories=risk_groups, processes=None):
+    # Save the response curve of each food group for each risk category as '<food group> <risk category> Risk.png'
+    render(response_curve_plots(risk_categories), processes)
@@ -0,0 +1,114 @@
+# Food Group Solver - bulk scoring
+#
+# Scores files of real diets, one row of the grams of the 12 food groups per diet, against the risk categories. The file is
+# read and written in chunks of rows, so memory does not grow with the number of diets, and the next chunk is read while
+# the current one is scored. Each chunk is scored with risk_matrix(), like the random simulation.
+#
+# Input is a .npy file of shape (N, 12), or a CSV file with the food groups in the order of food_groups. A CSV file may
+# start with a header row, in which case the columns named after the food groups are used, in any order.
+# Output has the average risk of each diet in each risk category, and for each risk category a number whose bit i is set
+# when food group i had grams outside its curve (for example bit 0 for Whole grains, bit 4 for Nuts). Output is a CSV file,
+# or a .npy file of a structured array with a field for each of these columns, which is much faster to write.
+
+import numpy as np
+import warnings
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .core import food_groups, risk_curves, risk_groups, risk_matrix
+
+def domain_flags(risk_categories, grams_matrix):
+    # (N, categories) array of the food groups of each diet outside their curve in each risk category, as bits 1 << index
+    # of the food group. Food groups without a curve are never outside it.
+    grams_matrix = np.atleast_2d(np.asarray(grams_matrix))
+    lows = np.array([[curve.low for curve in risk_curves[risk_category]] for risk_category in risk_categories], dtype=float)
+    highs = np.array([[curve.high for curve in risk_curves[risk_category]] for risk_category in risk_categories], dtype=float)
+    has_curve = np.array([[curve.equation is not None for curve in risk_curves[risk_category]] for risk_category in risk_categories])
+    grams = grams_matrix[:, np.newaxis, :]
+    outside = has_curve & ((grams < lows) | (grams > highs))  # (N, categories, 12)
+    return outside.astype(np.uint16) @ (np.uint16(1) << np.arange(len(food_groups), dtype=np.uint16))
+
+def read_header(file):
+    # Columns of the food groups from the first line of a CSV file, and whether it was a header. Without a header the file
+    # is rewound to its start.
+    line = file.readline()
+    names = [name.strip().strip('"') for name in line.split(',')]
+    try:
+        [float(name) for name in names]
+    except ValueError:
+        missing = [food_group for food_group in food_groups if food_group not in names]
+        if missing:
+            raise ValueError('the header of the file has no column for %s' % missing)
+        return [names.index(food_group) for food_group in food_groups], True
+    file.seek(0)
+    return list(range(len(food_groups))), False
+
+def read_diets(path, chunk_size=100000):
+    # The diets of a .npy or CSV file in chunks of up to chunk_size rows, as (rows, 12) arrays
+    if path.endswith('.npy'):
+        diets = np.load(path, mmap_mode='r')
+        if diets.ndim != 2 or diets.shape[1] != len(food_groups):
+            raise ValueError('%s has shape %s, expected (N, %d)' % (path, diets.shape, len(food_groups)))
+        for start in range(0, len(diets), chunk_size):
+            yield np.asarray(diets[start:start + chunk_size])
+        return
+
+    with open(path) as file:
+        columns, header = read_header(file)
+        while True:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)  # loadtxt warns at the end of the file
+                diets = np.loadtxt(file, delimiter=',', usecols=columns, max_rows=chunk_size, ndmin=2)
+            if len(diets) == 0:
+                return
+            yield diets
+
+def count_diets(path):
+    # Number of diets in a .npy or CSV file, without reading them all into memory
+    if path.endswith('.npy'):
+        return len(np.load(path, mmap_mode='r'))
+    with open(path) as file:
+        columns, header = read_header(file)
+        return sum(1 for line in file if line.strip())
+
+def score_columns(risk_categories):
+    return list(risk_categories) + [risk_category + ' out of range' for risk_category in risk_categories]
+
+def score_file(input_path, output_path, risk_categories=risk_groups, chunk_size=100000):
+    # Score every diet of input_path against risk_categories, writing the risks and out of range flags of each chunk to
+    # output_path as soon as it is scored. Returns the number of diets scored.
+    columns = score_columns(risk_categories)
+    if output_path.endswith('.npy'):
+        rows = count_diets(input_path)
+        dtype = np.dtype([(column, float) for column in risk_categories] + [(column, np.uint16) for column in columns[len(risk_categories):]])
+        output = np.lib.format.open_memmap(output_path, mode='w+', dtype=dtype, shape=(rows,))
+    else:
+        output = open(output_path, 'w')
+        output.write(','.join(columns) + '\n')
+
+    scored = 0
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        chunks = read_diets(input_path, chunk_size)
+        next_chunk = reader.submit(next, chunks, None)
+        while True:
+            diets = next_chunk.result()
+            if diets is None:
+                break
+            next_chunk = reader.submit(next, chunks, None)  # Read ahead while this chunk is scored
+
+            risks = risk_matrix(risk_categories, diets)
+            flags = domain_flags(risk_categories, diets)
+            if isinstance(output, np.ndarray):
+                rows = output[scored:scored + len(diets)]
+                for position, risk_category in enumerate(risk_categories):
+                    rows[risk_category] = risks[:, position]
+                    rows[columns[len(risk_categories) + position]] = flags[:, position]
+            else:
+                np.savetxt(output, np.hstack([risks, flags]), delimiter=',', fmt=['%.17g'] * len(risk_categories) + ['%d'] * len(risk_categories))
+            scored += len(diets)
+
+    if isinstance(output, np.ndarray):
+        output.flush()
+    else:
+        output.close()
+    return scored
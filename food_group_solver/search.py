@@ -0,0 +1,138 @@
+# Food Group Solver - local search
+#
+# Polishes good diets, like the lowest risk diets of the random simulation or the optimizer, by small changes in whole grams.
+# The average risk is a sum of one term per food group divided by the number of terms, so a Diet keeps the terms and
+# changing the grams of one or two food groups only updates their terms instead of scoring the whole diet again.
+
+import numpy as np
+
+from .core import risk_batch, risk_table
+
+class Diet:
+    # Diet in whole grams for one risk category, with the risk factor of each food group (NaN where it has none) and their
+    # total and number, so the average risk after changing one or two food groups takes a few operations.
+    # evaluations counts the diets scored this way.
+
+    def __init__(self, risk_category, grams):
+        self.risk_category = risk_category
+        self.table = risk_table(risk_category)
+        self.grams = [int(g) for g in grams]
+        self.factors = [self.factor(index, g) for index, g in enumerate(self.grams)]
+        self.total = sum(factor for factor in self.factors if not np.isnan(factor))
+        self.count = sum(1 for factor in self.factors if not np.isnan(factor))
+        self.grams_sum = sum(self.grams)
+        self.evaluations = 0
+
+    def factor(self, index, grams):
+        # Risk factor of a food group at grams, NaN where there is none as in risk_table()
+        return self.table[index, grams] if 0 <= grams < self.table.shape[1] else np.nan
+
+    def factors_at(self, index, grams):
+        # Risk factors of a food group at an array of grams
+        inside = (0 <= grams) & (grams < self.table.shape[1])
+        return np.where(inside, self.table[index, np.where(inside, grams, 0)], np.nan)
+
+    def average(self):
+        return self.total / self.count if self.count else np.nan
+
+    def average_with(self, index, grams):
+        # Average risk if food group index had each of an array of grams, without changing the diet
+        new = self.factors_at(index, np.asarray(grams))
+        old = self.factors[index]
+        total = self.total - (0 if np.isnan(old) else old) + np.where(np.isnan(new), 0, new)
+        count = self.count - (0 if np.isnan(old) else 1) + (~np.isnan(new))
+        self.evaluations += new.size
+        with np.errstate(all='ignore'):
+            return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+    def average_moved(self, giver, taker, grams):
+        # Average risk if grams moved from food group giver to taker, without changing the diet
+        total, count = self.total, self.count
+        for index, change in [(giver, -grams), (taker, grams)]:
+            old, new = self.factors[index], self.factor(index, self.grams[index] + change)
+            total += (0 if np.isnan(new) else new) - (0 if np.isnan(old) else old)
+            count += (0 if np.isnan(new) else 1) - (0 if np.isnan(old) else 1)
+        self.evaluations += 1
+        return total / count if count else np.nan
+
+    def set(self, index, grams):
+        # Change the grams of one food group
+        old, new = self.factors[index], self.factor(index, grams)
+        self.total += (0 if np.isnan(new) else new) - (0 if np.isnan(old) else old)
+        self.count += (0 if np.isnan(new) else 1) - (0 if np.isnan(old) else 1)
+        self.grams_sum += grams - self.grams[index]
+        self.grams[index] = grams
+        self.factors[index] = new
+
+    def solution(self):
+        # The diet as [diet, grams_sum, risk] like the results of the simulation, scored again from scratch so the risk is
+        # exactly the one risk() gives rather than a running total
+        return [list(self.grams), self.grams_sum, float(risk_batch(self.risk_category, [self.grams])[1][0])]
+
+def coordinate_descent(diet, bounds, g_range):
+    # Move one food group at a time to its best grams within bounds (highest excluded) that keep the total grams within
+    # g_range (lowest <= total < highest), until no food group can lower the average risk. Returns the number of moves.
+    moves = 0
+    improved = True
+    while improved:
+        improved = False
+        for index, (low, high) in enumerate(bounds):
+            others = diet.grams_sum - diet.grams[index]
+            grams = np.arange(max(low, g_range[0] - others), min(high, g_range[1] - others))
+            if len(grams) == 0:
+                continue
+            averages = diet.average_with(index, grams)
+            if np.all(np.isnan(averages)):
+                continue
+            best = int(np.nanargmin(averages))
+            if averages[best] < diet.average() - 1e-15 and grams[best] != diet.grams[index]:
+                diet.set(index, int(grams[best]))
+                moves += 1
+                improved = True
+    return moves
+
+def hill_climb(diet, bounds, steps=(1, 2, 5, 10, 20)):
+    # Move steps grams from one food group to another, which keeps the total grams, taking the best move each time until none
+    # lowers the average risk. This gets past diets where coordinate_descent() is held at the edge of a range of total grams.
+    # Returns the number of moves.
+    moves = 0
+    while True:
+        current = diet.average()
+        best = None
+        for giver, (giver_low, giver_high) in enumerate(bounds):
+            for taker, (taker_low, taker_high) in enumerate(bounds):
+                for step in steps:
+                    if taker == giver or diet.grams[giver] - step < giver_low or diet.grams[taker] + step >= taker_high:
+                        continue
+                    average = diet.average_moved(giver, taker, step)
+                    if average < current - 1e-15 and (best is None or average < best[0]):
+                        best = (average, giver, taker, step)
+        if best is None:
+            return moves
+        average, giver, taker, step = best
+        diet.set(giver, diet.grams[giver] - step)
+        diet.set(taker, diet.grams[taker] + step)
+        moves += 1
+
+def refine(risk_category, grams, bounds, g_range):
+    # Lowest risk diet found from grams by coordinate_descent() and hill_climb() in turn until neither moves, keeping each
+    # food group within bounds and the total grams within g_range. Returns the Diet.
+    diet = Diet(risk_category, grams)
+    while coordinate_descent(diet, bounds, g_range) + hill_climb(diet, bounds):
+        pass
+    return diet
+
+def refine_bands(risk_category, solutions, bounds, g_intake_range):
+    # Refine the [diet, grams_sum, risk] of each range of g_intake_range, eg the 'g_vars' of simulate(), within its range.
+    # Ranges without a diet ([None, 2] or None) are left as they are. Returns the refined solutions and the number of diets
+    # scored by Diet to find them.
+    refined = []
+    evaluations = 0
+    for solution, g_range in zip(solutions, g_intake_range):
+        if solution is None or solution[0] is None:
+            refined.append(solution)
+            continue
+        diet = refine(risk_category, solution[0], bounds, g_range)
+        evaluations += diet.evaluations
+        refined.append(diet.solution())
+    return refined, evaluations
@@ -0,0 +1,207 @@
+# Food Group Solver - scoring server
+#
+# A long-lived process that keeps the curves loaded and scores diets sent over HTTP as JSON, on a local TCP port or a Unix
+# socket. The diets of requests that arrive at about the same time are gathered into one batch and scored with a single
+# risk_matrix() call, waiting at most max_wait seconds for a batch to fill up to max_batch diets.
+#
+#   POST /score  {"diets": [[grams of the 12 food groups], ...], "categories": ["Mortality", ...]}  (or "diet": [...])
+#                -> {"risks": {"Mortality": [risk of each diet, null where it has none], ...}}
+#   GET /stats   -> {"requests": ..., "diets": ..., "batches": ...} since the server started
+#
+# Only the standard library and numpy are used, so the server runs anywhere the package does, and score_remote() is a
+# client for it.
+
+import asyncio
+import http.client
+import json
+import numpy as np
+import socket
+
+from .core import food_groups, risk_groups, risk_matrix
+
+class Batcher:
+    # Gathers the diets of concurrent requests into batches of up to max_batch diets, each scored with one risk_matrix()
+    # call for all risk_categories. A batch is scored as soon as it is full, or max_wait seconds after its first request.
+    # A request that arrives on its own is scored at once, so there is only a wait when other requests are coming in.
+
+    def __init__(self, risk_categories=risk_groups, max_batch=1024, max_wait=0.002):
+        self.risk_categories = list(risk_categories)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.requests = 0
+        self.diets = 0
+        self.batches = 0
+
+    async def score(self, diets):
+        # (N, categories) risks of an (N, 12) array of diets, once the batch they are in has been scored
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((diets, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            await asyncio.sleep(0)  # Let requests that have already arrived join the batch
+            while size < self.max_batch and not (len(batch) == 1 and self.queue.empty()):
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self.queue.get_nowait()
+                batch.append(item)
+                size += len(item[0])
+            self.score_batch(batch)
+
+    def score_batch(self, batch):
+        try:
+            risks = risk_matrix(self.risk_categories, np.concatenate([diets for diets, future in batch]))
+        except Exception as error:
+            for diets, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.requests += len(batch)
+        self.diets += len(risks)
+        self.batches += 1
+        start = 0
+        for diets, future in batch:
+            if not future.done():
+                future.set_result(risks[start:start + len(diets)])
+            start += len(diets)
+
+def parse_diets(request, risk_categories):
+    # The (N, 12) diets and the risk categories asked for in the JSON body of a request to /score
+    diets = request['diets'] if 'diets' in request else [request['diet']]
+    diets = np.array(diets, dtype=float)
+    if diets.ndim != 2 or diets.shape[1] != len(food_groups):
+        raise ValueError('each diet must have the grams of the %d food groups %s' % (len(food_groups), food_groups))
+    categories = request.get('categories', risk_categories)
+    unknown = [risk_category for risk_category in categories if risk_category not in risk_categories]
+    if unknown:
+        raise ValueError('unknown risk categories %s, expected some of %s' % (unknown, risk_categories))
+    return diets, categories
+
+class ScoringServer:
+    # HTTP/1.1 server for a Batcher, keeping connections open between requests
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.connections = set()  # Tasks of the open connections, cancelled by close_connections() when the server stops
+
+    async def respond(self, method, target, body):
+        # Status and JSON reply of one request
+        if method == 'GET' and target == '/stats':
+            return 200, {'requests': self.batcher.requests, 'diets': self.batcher.diets, 'batches': self.batcher.batches}
+        if method != 'POST' or target != '/score':
+            return 404, {'error': 'expected POST /score or GET /stats'}
+        try:
+            diets, categories = parse_diets(json.loads(body), self.batcher.risk_categories)
+        except (ValueError, TypeError, KeyError) as error:
+            return 400, {'error': str(error)}
+        risks = await self.batcher.score(diets)
+        columns = {risk_category: position for position, risk_category in enumerate(self.batcher.risk_categories)}
+        return 200, {'risks': {risk_category: [None if np.isnan(value) else value for value in risks[:, columns[risk_category]].tolist()]
+                               for risk_category in categories}}
+
+    async def handle(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, separator, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, reply = await self.respond(method, target, body)
+                content = json.dumps(reply).encode()
+                close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0'
+                writer.write(b'HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n'
+                             % (status, http.client.responses[status].encode(), len(content), b'close' if close else b'keep-alive') + content)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # The client went away or sent something that is not HTTP
+        except asyncio.CancelledError:
+            pass  # Stopped by close_connections(), ending normally as asyncio.start_server() calls exception() on the task
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    async def close_connections(self):
+        # Stop the connections that are still open, such as clients keeping them alive between requests, and wait for them
+        connections = list(self.connections)
+        for task in connections:
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+
+async def serve(host='127.0.0.1', port=8765, path=None, max_batch=1024, max_wait=0.002, started=None):
+    # Run a scoring server on host and port, or on the Unix socket at path, until it is cancelled.
+    # started, if given, is called with the asyncio server once it is listening.
+    batcher = Batcher(max_batch=max_batch, max_wait=max_wait)
+    server = ScoringServer(batcher)
+    if path is None:
+        listener = await asyncio.start_server(server.handle, host, port)
+    else:
+        listener = await asyncio.start_unix_server(server.handle, path)
+    if started is not None:
+        started(listener)
+    batching = asyncio.create_task(batcher.run())
+    try:
+        async with listener:
+            try:
+                await listener.serve_forever()
+            finally:
+                await server.close_connections()  # Before the listener waits for them to close
+    finally:
+        batching.cancel()
+        await asyncio.gather(batching, return_exceptions=True)
+
+class UnixConnection(http.client.HTTPConnection):
+    # http.client connection over a Unix socket, for score_remote()
+
+    def __init__(self, path):
+        super().__init__('localhost')
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+def score_remote(diets, categories=None, host='127.0.0.1', port=8765, path=None, connection=None):
+    # Risks of a list of diets from a scoring server, as {risk category: [risk of each diet]}. Pass an open
+    # http.client connection to reuse it between calls, otherwise one is made to host and port, or the Unix socket at path.
+    request = {'diets': [list(diet) for diet in diets]}
+    if categories is not None:
+        request['categories'] = list(categories)
+    own = connection is None
+    if own:
+        connection = http.client.HTTPConnection(host, port) if path is None else UnixConnection(path)
+    try:
+        connection.request('POST', '/score', json.dumps(request), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        reply = json.loads(response.read())
+    finally:
+        if own:
+            connection.close()
+    if response.status != 200:
+        raise ValueError(reply.get('error', response.reason))
+    return reply['risks']
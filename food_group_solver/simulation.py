@@ -0,0 +1,493 @@
+# Food Group Solver - random simulation
+#
+# Random diets scored in parallel chunks, keeping the lowest risk diets of each range of total grams and running statistics,
+# and a memory-mapped store of random diets to reuse between runs.
+# The diets are drawn with independent random numbers, or a Sobol or Latin hypercube design that spreads them more evenly
+# over the bounds, and a simulation can stop early once the lowest risk of every range has stopped improving.
+
+import json
+import numpy as np
+import os
+import warnings
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .core import combined_category, combined_risk, food_groups, risk_matrix
+
+def intake_range_index(grams_sums, g_intake_range):
+    # Index into g_intake_range of the (lowest, highest) range each total of grams falls in, with lowest <= grams < highest,
+    # or -1 when it is in no range. The ranges must not overlap.
+    grams_sums = np.asarray(grams_sums)
+    lows = np.array([g1 for g1, g2 in g_intake_range])
+    highs = np.array([g2 for g1, g2 in g_intake_range])
+    order = np.argsort(lows, kind='stable')
+    position = np.searchsorted(lows[order], grams_sums, side='right') - 1
+    index = order[np.maximum(position, 0)]
+    return np.where((position >= 0) & (grams_sums < highs[index]), index, -1)
+
+class BandTracker:
+    # The k lowest risk diets in each range of g_intake_range, updated with whole chunks of diets at a time.
+    # Diets with equal risk keep the order they were added in, so the first one found stays ahead.
+
+    def __init__(self, g_intake_range, k=10):
+        self.g_intake_range = g_intake_range
+        self.k = k
+        self.diets = [np.empty((0, len(food_groups)), dtype=int) for g in g_intake_range]
+        self.grams_sums = [np.empty(0, dtype=int) for g in g_intake_range]
+        self.risks = [np.empty(0) for g in g_intake_range]
+
+    def add(self, diets, average_risk, range_index=None):
+        # Add an (N, 12) array of diets with their average risk, ignoring any with a NaN risk.
+        # range_index is the intake_range_index() of the diets, if already known.
+        diets = np.atleast_2d(np.asarray(diets))
+        average_risk = np.asarray(average_risk, dtype=float)
+        grams_sums = diets.sum(axis=1)
+        if range_index is None:
+            range_index = intake_range_index(grams_sums, self.g_intake_range)
+        index = np.where(np.isnan(average_risk), -1, range_index)
+
+        # Group the diets by range, then keep only the k lowest risks of each range before merging
+        order = np.argsort(index.astype(np.int16), kind='stable')
+        bounds = np.searchsorted(index[order], np.arange(len(self.g_intake_range) + 1))
+        for band in range(len(self.g_intake_range)):
+            rows = order[bounds[band]:bounds[band + 1]]
+            if len(rows) > self.k:
+                # The diets below the k-th lowest risk, then the first added of those tied at it, as argpartition() takes any
+                risks = average_risk[rows]
+                kth = np.partition(risks, self.k - 1)[self.k - 1]
+                below = rows[risks < kth]
+                rows = np.sort(np.concatenate([below, rows[risks == kth][:self.k - len(below)]]))
+            if len(rows):
+                self.keep(band, diets[rows], grams_sums[rows], average_risk[rows])
+
+    def merge(self, other):
+        # Add the diets kept by another BandTracker over the same ranges, which count as added after these
+        for band in range(len(self.g_intake_range)):
+            if len(other.risks[band]):
+                self.keep(band, other.diets[band], other.grams_sums[band], other.risks[band])
+
+    def keep(self, band, diets, grams_sums, risks):
+        risks = np.concatenate([self.risks[band], risks])
+        kept = np.argsort(risks, kind='stable')[:self.k]
+        self.diets[band] = np.concatenate([self.diets[band], diets])[kept]
+        self.grams_sums[band] = np.concatenate([self.grams_sums[band], grams_sums])[kept]
+        self.risks[band] = risks[kept]
+
+    def top(self, band):
+        # The kept diets of a range as [diet, grams_sum, risk], lowest risk first
+        return [[diet.tolist(), int(grams_sum), float(risk)] for diet, grams_sum, risk in zip(self.diets[band], self.grams_sums[band], self.risks[band])]
+
+    def g_vars(self):
+        # The lowest risk [diet, grams_sum, risk] of each range, or [None, 2] if no diet fell in it
+        return [self.top(band)[0] if len(self.risks[band]) else [None, 2] for band in range(len(self.g_intake_range))]
+
+    def best(self):
+        # The lowest risk [diet, grams_sum, risk] of any range, or [[], 0, 2] if no diet fell in any
+        solutions = [solution for solution in self.g_vars() if solution != [None, 2]]
+        return sorted(solutions, key=lambda solution: solution[2])[0] if solutions else [[], 0, 2]
+
+    def arrays(self):
+        # The kept diets of every range as a dict of arrays, eg to save with numpy.savez(), read back with from_arrays()
+        return {'k': np.array(self.k), 'counts': np.array([len(risks) for risks in self.risks]),
+                'diets': np.concatenate(self.diets), 'grams_sums': np.concatenate(self.grams_sums), 'risks': np.concatenate(self.risks)}
+
+    @classmethod
+    def from_arrays(cls, g_intake_range, arrays):
+        tracker = cls(g_intake_range, int(arrays['k']))
+        bounds = np.cumsum(arrays['counts'])[:-1]
+        tracker.diets = np.split(arrays['diets'], bounds)
+        tracker.grams_sums = np.split(arrays['grams_sums'], bounds)
+        tracker.risks = np.split(arrays['risks'], bounds)
+        return tracker
+
+class RunningStats:
+    # Running statistics of the total grams and risk of the diets of a simulation, which take the same memory however many
+    # diets are added. Keeps the count, means and sums of squared deviations needed for the linear fit and r^2, the count,
+    # total and lowest risk in each range of g_intake_range, and a random sample of sample_size diets for plotting.
+    # Statistics of separate chunks of diets are combined with merge().
+
+    def __init__(self, g_intake_range, sample_size=10000):
+        self.g_intake_range = g_intake_range
+        self.sample_size = sample_size
+
+        self.count = 0
+        self.mean_grams = 0.0
+        self.mean_risk = 0.0
+        self.grams_squares = 0.0  # Sum of squared deviations of the grams from their mean
+        self.risk_squares = 0.0
+        self.cross_squares = 0.0  # Sum of the products of the grams and risk deviations
+
+        self.range_counts = [0] * len(g_intake_range)
+        self.range_risk_sums = [0.0] * len(g_intake_range)
+        self.range_smallest = [None] * len(g_intake_range)
+
+        # The sample keeps the diets with the smallest random keys, which is a uniform random sample of all diets added
+        self.sample_keys = np.empty(0)
+        self.sample_grams = np.empty(0)
+        self.sample_risk = np.empty(0)
+
+    def add(self, grams_sums, average_risk, keys, range_index=None):
+        # Add the total grams and average risk of a chunk of diets, with a uniform random key in [0, 1) for each diet.
+        # range_index is the intake_range_index() of the diets, if already known.
+        if range_index is None:
+            range_index = intake_range_index(grams_sums, self.g_intake_range)
+        scored = ~np.isnan(average_risk)
+        grams_sums, average_risk, keys, range_index = grams_sums[scored].astype(float), average_risk[scored], keys[scored], range_index[scored]
+
+        chunk = RunningStats(self.g_intake_range, self.sample_size)
+        chunk.count = len(grams_sums)
+        if chunk.count:
+            chunk.mean_grams = grams_sums.mean()
+            chunk.mean_risk = average_risk.mean()
+            chunk.grams_squares = np.sum((grams_sums - chunk.mean_grams) ** 2)
+            chunk.risk_squares = np.sum((average_risk - chunk.mean_risk) ** 2)
+            chunk.cross_squares = np.sum((grams_sums - chunk.mean_grams) * (average_risk - chunk.mean_risk))
+
+        ranges = len(self.g_intake_range)
+        index = range_index
+        in_range = index >= 0
+        chunk.range_counts = np.bincount(index[in_range], minlength=ranges).tolist()
+        chunk.range_risk_sums = np.bincount(index[in_range], weights=average_risk[in_range], minlength=ranges).tolist()
+        smallest = np.full(ranges, np.inf)
+        np.minimum.at(smallest, index[in_range], average_risk[in_range])
+        chunk.range_smallest = [None if np.isinf(value) else float(value) for value in smallest]
+
+        kept = np.argpartition(keys, self.sample_size)[:self.sample_size] if len(keys) > self.sample_size else np.arange(len(keys))
+        chunk.sample_keys, chunk.sample_grams, chunk.sample_risk = keys[kept], grams_sums[kept], average_risk[kept]
+        self.merge(chunk)
+
+    def merge(self, other):
+        # Combine the statistics of other into these, using the pairwise update of the means and sums of squares
+        count = self.count + other.count
+        if other.count:
+            grams_change = other.mean_grams - self.mean_grams
+            risk_change = other.mean_risk - self.mean_risk
+            weight = self.count * other.count / count
+            self.grams_squares += other.grams_squares + grams_change ** 2 * weight
+            self.risk_squares += other.risk_squares + risk_change ** 2 * weight
+            self.cross_squares += other.cross_squares + grams_change * risk_change * weight
+            self.mean_grams += grams_change * other.count / count
+            self.mean_risk += risk_change * other.count / count
+            self.count = count
+
+        for index in range(len(self.g_intake_range)):
+            self.range_counts[index] += other.range_counts[index]
+            self.range_risk_sums[index] += other.range_risk_sums[index]
+            if other.range_smallest[index] is not None and (self.range_smallest[index] is None or other.range_smallest[index] < self.range_smallest[index]):
+                self.range_smallest[index] = other.range_smallest[index]
+
+        keys = np.concatenate([self.sample_keys, other.sample_keys])
+        kept = np.argsort(keys, kind='stable')[:self.sample_size]
+        self.sample_keys = keys[kept]
+        self.sample_grams = np.concatenate([self.sample_grams, other.sample_grams])[kept]
+        self.sample_risk = np.concatenate([self.sample_risk, other.sample_risk])[kept]
+
+    def range_mean_risk(self):
+        # Average risk of the diets in each range, None where there were none
+        return [risk_sum / count if count else None for risk_sum, count in zip(self.range_risk_sums, self.range_counts)]
+
+    def fit(self):
+        # Least squares line of the risk against the total grams, as slope m, intercept b and r^2, or None when the diets
+        # do not have different totals and risks to fit a line to
+        if not self.grams_squares or not self.risk_squares:
+            return None
+        m = self.cross_squares / self.grams_squares
+        b = self.mean_risk - m * self.mean_grams
+        r2 = self.cross_squares ** 2 / (self.grams_squares * self.risk_squares)
+        return m, b, r2
+
+    def arrays(self):
+        # The statistics as a dict of arrays, eg to save with numpy.savez(), read back with from_arrays()
+        return {'sample_size': np.array(self.sample_size),
+                'moments': np.array([self.count, self.mean_grams, self.mean_risk, self.grams_squares, self.risk_squares, self.cross_squares]),
+                'range_counts': np.array(self.range_counts), 'range_risk_sums': np.array(self.range_risk_sums),
+                'range_smallest': np.array([np.nan if value is None else value for value in self.range_smallest]),
+                'sample_keys': self.sample_keys, 'sample_grams': self.sample_grams, 'sample_risk': self.sample_risk}
+
+    @classmethod
+    def from_arrays(cls, g_intake_range, arrays):
+        stats = cls(g_intake_range, int(arrays['sample_size']))
+        count, stats.mean_grams, stats.mean_risk, stats.grams_squares, stats.risk_squares, stats.cross_squares = arrays['moments'].tolist()
+        stats.count = int(count)
+        stats.range_counts = arrays['range_counts'].tolist()
+        stats.range_risk_sums = arrays['range_risk_sums'].tolist()
+        stats.range_smallest = [None if np.isnan(value) else value for value in arrays['range_smallest'].tolist()]
+        stats.sample_keys, stats.sample_grams, stats.sample_risk = arrays['sample_keys'], arrays['sample_grams'], arrays['sample_risk']
+        return stats
+
+def summarize_chunk(risk_categories, diets, risks, g_intake_range, keys, sample_size, k):
+    # BandTracker of the k lowest risk diets in each range of g_intake_range and RunningStats of a chunk of diets, for each
+    # risk category (column of risks), and for the combined_category average over the risk categories when there are several.
+    # keys are uniform random numbers, one per diet, that pick the diets sampled for plotting.
+    risks = np.asarray(risks, dtype=float)
+    grams_sums = diets.sum(axis=1)
+    range_index = intake_range_index(grams_sums, g_intake_range)
+
+    columns = list(zip(risk_categories, risks.T))
+    if len(risk_categories) > 1:
+        columns.append((combined_category, combined_risk(risks)))
+
+    results = {}
+    for risk_category, average_risk in columns:
+        tracker = BandTracker(g_intake_range, k)
+        tracker.add(diets, average_risk, range_index)
+        stats = RunningStats(g_intake_range, sample_size)
+        stats.add(grams_sums, average_risk, keys, range_index)
+        results[risk_category] = (tracker, stats)
+    return results
+
+samplers = ['random', 'sobol', 'latin']  # Ways to draw the diets of a simulation, see draw_diets()
+
+def draw_diets(generator, samples, bounds, sampler='random', start=0, design_seed=None):
+    # samples diets in whole grams within bounds, as an (samples, 12) array. 'random' draws each food group independently
+    # with generator, 'sobol' takes diets start to start + samples of one scrambled Sobol sequence seeded by design_seed,
+    # shared by all the chunks of a simulation, and 'latin' draws a Latin hypercube of the chunk with generator.
+    if sampler == 'random':
+        return np.stack([generator.integers(low, high, samples) for low, high in bounds], axis=1)
+
+    from scipy.stats import qmc
+    if sampler == 'sobol':
+        # scipy spawns from the SeedSequence of a Generator, which differs on each use, so the engines get whole numbers
+        engine = qmc.Sobol(len(bounds), seed=int(design_seed.generate_state(1, np.uint64)[0]))
+        if start:
+            engine.fast_forward(start)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)  # Chunks are not a power of 2 long, the sequence as a whole is balanced
+            points = engine.random(samples)
+    elif sampler == 'latin':
+        points = qmc.LatinHypercube(len(bounds), seed=int(generator.integers(2 ** 63))).random(samples)
+    else:
+        raise ValueError('unknown sampler %r, expected one of %s' % (sampler, samplers))
+
+    # Each point in [0, 1) covers the same share of every whole number of grams from low to high - 1
+    lows = np.array([low for low, high in bounds])
+    highs = np.array([high for low, high in bounds])
+    return np.minimum(lows + np.floor(points * (highs - lows)).astype(np.int64), highs - 1)
+
+def simulate_chunk(risk_categories, samples, bounds, g_intake_range, seed_sequence, sample_size, k, sampler='random', start=0, design_seed=None):
+    # One chunk of the random simulation: samples diets within bounds from draw_diets(), drawn once and scored for all
+    # risk_categories, summarized by summarize_chunk(). The same diets are sampled for plotting in every risk category.
+    generator = np.random.default_rng(seed_sequence)
+    diets = draw_diets(generator, samples, bounds, sampler, start, design_seed)
+    risks = risk_matrix(risk_categories, diets)
+    return summarize_chunk(risk_categories, diets, risks, g_intake_range, generator.random(samples), sample_size, k)
+
+def simulate(risk_categories, random_tries, bounds, g_intake_range, seed=None, processes=None, chunk_size=100000, sample_size=10000, k=10, shared=False,
+             sampler='random', tolerance=None, window=3):
+    # Random simulation of random_tries diets for each risk category, split into chunks of chunk_size diets that run on up to
+    # processes cores (default all, 1 runs here without a pool). Each chunk draws from its own generator spawned from
+    # numpy.random.SeedSequence(seed), and chunks are merged in order as they finish, so a given seed gives exactly the
+    # same results whatever the number of processes and memory does not grow with random_tries.
+    # With shared, the same random diets are scored for every risk category in one pass, which also gives the results of
+    # their average risk under combined_category. Otherwise each risk category draws its own diets.
+    # sampler is how the diets are drawn, one of samplers (see draw_diets()). With a tolerance, each risk category stops
+    # early, after fewer than random_tries diets, once the lowest risk of every range has not dropped by more than tolerance
+    # over its last window chunks (shared diets stop when every risk category has).
+    # Returns, for each risk category, the lowest risk [diet, grams_sum, risk] in each range of g_intake_range
+    # ([None, 2] if no diet fell in it) as 'g_vars', the overall lowest as 'best', the BandTracker of the k lowest risk
+    # diets in each range as 'tracker', the RunningStats of all the diets as 'stats' and the Convergence of the lowest
+    # risks after each chunk as 'convergence'.
+    tasks = simulation_tasks(risk_categories, random_tries, bounds, g_intake_range, seed, chunk_size, sample_size, k, shared, sampler)
+    return merge_chunks(simulate_chunk, tasks, g_intake_range, processes, sample_size, k, tolerance, window)
+
+def simulation_tasks(risk_categories, random_tries, bounds, g_intake_range, seed, chunk_size, sample_size, k, shared, sampler='random'):
+    # Arguments of simulate_chunk() for each chunk of simulate(), in order
+    chunk_sizes = [chunk_size] * (random_tries // chunk_size) + ([random_tries % chunk_size] if random_tries % chunk_size else [])
+    starts = [chunk_size * chunk for chunk in range(len(chunk_sizes))]
+    tasks = []
+    if shared:
+        seed_sequence = np.random.SeedSequence(seed)
+        for samples, start, chunk_seed in zip(chunk_sizes, starts, seed_sequence.spawn(len(chunk_sizes))):
+            tasks.append((risk_categories, samples, bounds, g_intake_range, chunk_seed, sample_size, k, sampler, start, seed_sequence))
+    else:
+        for risk_category, category_seed in zip(risk_categories, np.random.SeedSequence(seed).spawn(len(risk_categories))):
+            for samples, start, chunk_seed in zip(chunk_sizes, starts, category_seed.spawn(len(chunk_sizes))):
+                tasks.append(([risk_category], samples, bounds, g_intake_range, chunk_seed, sample_size, k, sampler, start, category_seed))
+    return tasks
+
+class Convergence:
+    # Lowest risk in each range of g_intake_range after each chunk of a simulation. It has converged once no range's lowest
+    # risk has dropped by more than tolerance over the last window chunks, where a first diet in a range counts as an
+    # infinite drop and a range that is still empty as none.
+
+    def __init__(self, tolerance=None, window=3):
+        self.tolerance = tolerance
+        self.window = window
+        self.tries = []  # Diets scored so far after each chunk
+        self.best = []  # Lowest risk of each range after each chunk, None while it has no diets
+        self.improvement = []  # Largest drop of the lowest risk of any range in each chunk
+
+    def add(self, tracker, tries):
+        best = [float(risks[0]) if len(risks) else None for risks in tracker.risks]
+        self.improvement.append(largest_drop(self.best[-1] if self.best else [None] * len(best), best))
+        self.tries.append(tries)
+        self.best.append(best)
+
+    def converged(self):
+        if self.tolerance is None or len(self.best) <= self.window:
+            return False
+        return largest_drop(self.best[-1 - self.window], self.best[-1]) <= self.tolerance
+
+    def trace(self):
+        # The convergence as a list of {'tries', 'best', 'improvement'} after each chunk, eg to save as JSON
+        return [{'tries': tries, 'best': best, 'improvement': improvement} for tries, best, improvement in zip(self.tries, self.best, self.improvement)]
+
+    def arrays(self):
+        # The trace as a dict of arrays, eg to save with numpy.savez(), read back with from_arrays()
+        return {'settings': np.array([np.nan if self.tolerance is None else self.tolerance, self.window]), 'tries': np.array(self.tries, dtype=np.int64),
+                'best': np.array([[np.nan if risk is None else risk for risk in best] for best in self.best]), 'improvement': np.array(self.improvement)}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        tolerance, window = arrays['settings'].tolist()
+        convergence = cls(None if np.isnan(tolerance) else tolerance, int(window))
+        convergence.tries = arrays['tries'].tolist()
+        convergence.best = [[None if np.isnan(risk) else risk for risk in best] for best in arrays['best'].tolist()]
+        convergence.improvement = arrays['improvement'].tolist()
+        return convergence
+
+def largest_drop(old_best, new_best):
+    # Largest drop of the lowest risk of any range from old_best to new_best, as in Convergence
+    drops = [0.0]
+    for old, new in zip(old_best, new_best):
+        if new is not None:
+            drops.append(np.inf if old is None else old - new)
+    return max(drops)
+
+def merge_chunks(chunk_function, tasks, g_intake_range, processes, sample_size, k, tolerance=None, window=3):
+    # Run chunk_function on each task, on up to processes cores (1 runs here without a pool), and merge the summaries of
+    # summarize_chunk() it returns in the order of the tasks into the results of simulate().
+    # With a tolerance, the tasks of simulate_chunk(), which start with their risk categories, are skipped once all of
+    # their risk categories have converged. That only depends on the chunks merged before, so it is the same for any processes.
+    simulations = {}
+
+    def wanted(task):
+        if tolerance is None:
+            return True
+        names = list(task[0]) + ([combined_category] if len(task[0]) > 1 else [])
+        return not all(name in simulations and simulations[name]['convergence'].converged() for name in names)
+
+    for chunk in run_chunks(chunk_function, tasks, processes, wanted):
+        for risk_category, (chunk_tracker, chunk_stats) in chunk.items():
+            if risk_category not in simulations:
+                simulations[risk_category] = {'tracker': BandTracker(g_intake_range, k), 'stats': RunningStats(g_intake_range, sample_size),
+                                              'convergence': Convergence(tolerance, window)}
+            simulation = simulations[risk_category]
+            simulation['tracker'].merge(chunk_tracker)
+            simulation['stats'].merge(chunk_stats)
+            simulation['convergence'].add(simulation['tracker'], simulation['stats'].count)
+
+    for simulation in simulations.values():
+        simulation['g_vars'] = simulation['tracker'].g_vars()
+        simulation['best'] = simulation['tracker'].best()
+
+    return simulations
+
+def run_chunks(chunk_function, tasks, processes, wanted):
+    # Results of chunk_function on each task in order, on up to processes cores (1 runs here without a pool), for the tasks
+    # that are still wanted() when they are reached. Only a few tasks are handed to the pool ahead of the results.
+    if processes == 1:
+        for task in tasks:
+            if wanted(task):
+                yield chunk_function(*task)
+        return
+
+    ahead = 2 * (processes or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending = deque()
+        for task in tasks:
+            if wanted(task):
+                pending.append((task, executor.submit(chunk_function, *task)))
+            while len(pending) > ahead or (pending and pending[0][1].done()):
+                task, future = pending.popleft()
+                if wanted(task):
+                    yield future.result()
+                else:
+                    future.cancel()
+        while pending:
+            task, future = pending.popleft()
+            if wanted(task):
+                yield future.result()
+            else:
+                future.cancel()
+
+class SampleStore:
+    # Random diets and their risks kept on disk, so very large sets of diets can be shared between runs and processes.
+    # The folder at path holds diets.npy, a uint16 (N, 12) array of the grams of each diet, risks.npy, a float32 array with
+    # the average risk of each diet in a column for each risk category, and store.json with how the diets were drawn.
+    # Both arrays are memory-mapped, so read() returns slices without copying or loading the whole store.
+
+    def __init__(self, path, mode='r'):
+        self.path = path
+        with open(os.path.join(path, 'store.json')) as file:
+            self.settings = json.load(file)
+        self.risk_categories = self.settings['risk_categories']
+        self.diets = np.load(os.path.join(path, 'diets.npy'), mmap_mode=mode)
+        self.risks = np.load(os.path.join(path, 'risks.npy'), mmap_mode=mode)
+
+    def __len__(self):
+        return len(self.diets)
+
+    @classmethod
+    def create(cls, path, samples, risk_categories, settings=None):
+        # Make an empty store for samples diets scored for risk_categories, with any other settings saved in store.json
+        os.makedirs(path, exist_ok=True)
+        np.lib.format.open_memmap(os.path.join(path, 'diets.npy'), mode='w+', dtype=np.uint16, shape=(samples, len(food_groups))).flush()
+        np.lib.format.open_memmap(os.path.join(path, 'risks.npy'), mode='w+', dtype=np.float32, shape=(samples, len(risk_categories))).flush()
+        with open(os.path.join(path, 'store.json'), 'w') as file:
+            json.dump(dict(settings or {}, samples=samples, food_groups=food_groups, risk_categories=list(risk_categories)), file, indent=4)
+        return cls(path, mode='r+')
+
+    def read(self, start, stop):
+        # Diets and risks from start up to stop, as views of the files
+        return self.diets[start:stop], self.risks[start:stop]
+
+    def write(self, start, diets, risks):
+        self.diets[start:start + len(diets)] = diets
+        self.risks[start:start + len(risks)] = risks
+        self.diets.flush()
+        self.risks.flush()
+
+def fill_store_chunk(path, start, samples, bounds, seed_sequence):
+    # Draw one chunk of random diets for a SampleStore, score them and write them to their place in the store
+    store = SampleStore(path, mode='r+')
+    generator = np.random.default_rng(seed_sequence)
+    diets = np.stack([generator.integers(low, high, samples) for low, high in bounds], axis=1)
+    store.write(start, diets, risk_matrix(store.risk_categories, diets))
+
+def build_sample_store(path, random_tries, bounds, risk_categories, seed=None, processes=None, chunk_size=100000):
+    # Draw random_tries diets within bounds into a new SampleStore at path, scored for each risk category. Chunks of chunk_size
+    # diets are drawn and written in parallel on up to processes cores (1 runs here without a pool), each with its own
+    # generator spawned from numpy.random.SeedSequence(seed) as in simulate(shared=True), so a given seed fills the same store.
+    if max(high for low, high in bounds) > np.iinfo(np.uint16).max + 1:
+        raise ValueError('A sample store holds at most %d grams per food group' % np.iinfo(np.uint16).max)
+
+    seed_sequence = np.random.SeedSequence(seed)
+    SampleStore.create(path, random_tries, risk_categories, {'bounds': bounds, 'seed': seed_sequence.entropy, 'chunk_size': chunk_size})
+    starts = list(range(0, random_tries, chunk_size))
+    tasks = [(path, start, min(chunk_size, random_tries - start), bounds, chunk_seed) for start, chunk_seed in zip(starts, seed_sequence.spawn(len(starts)))]
+
+    if processes == 1:
+        for task in tasks:
+            fill_store_chunk(*task)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            list(executor.map(fill_store_chunk, *zip(*tasks)))
+    return SampleStore(path)
+
+def store_chunk(path, start, stop, g_intake_range, seed_sequence, sample_size, k):
+    # Summarize the diets of a SampleStore from start up to stop with summarize_chunk()
+    store = SampleStore(path)
+    diets, risks = store.read(start, stop)
+    keys = np.random.default_rng(seed_sequence).random(stop - start)
+    return summarize_chunk(store.risk_categories, diets, risks, g_intake_range, keys, sample_size, k)
+
+def summarize_store(path, g_intake_range, seed=None, processes=None, chunk_size=100000, sample_size=10000, k=10):
+    # Results of simulate() for the diets saved in a SampleStore, without drawing or scoring them again. Chunks of the store
+    # are read in parallel on up to processes cores; seed picks the diets sampled for plotting.
+    samples = len(SampleStore(path))
+    starts = list(range(0, samples, chunk_size))
+    tasks = [(path, start, min(start + chunk_size, samples), g_intake_range, chunk_seed, sample_size, k)
+             for start, chunk_seed in zip(starts, np.random.SeedSequence(seed).spawn(len(starts)))]
+    return merge_chunks(store_chunk, tasks, g_intake_range, processes, sample_size, k)
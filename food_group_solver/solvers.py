@@ -0,0 +1,114 @@
+# Food Group Solver - lowest risk diets
+#
+# Exact solutions of the lowest risk diet in each range of total grams, and gradient based optimization from initial guesses.
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from scipy import optimize
+
+from .core import risk, risk_curves, risk_table
+
+def solve_bands(risk_category, bounds, g_intake_range):
+    # Exact lowest risk diet for every range of total grams, in whole grams within bounds, one (lowest, highest) per food group
+    # with the highest excluded like random.randint. The average risk is a sum of one term per food group divided by the number
+    # of terms, so a knapsack over the total grams and the number of terms finds the smallest sum for every total at once.
+    # Returns [diet, grams_sum, risk] for each range of g_intake_range, or None when no diet within bounds falls in the range.
+    table = risk_table(risk_category)
+    most_grams = max(g2 for g1, g2 in g_intake_range) - 1  # Totals above this are in no range
+    terms = len(bounds)
+
+    # smallest[k, t] is the smallest sum of k risk factors over the food groups so far, with t grams in total
+    smallest = np.full((terms + 1, most_grams + 1), np.inf)
+    smallest[0, 0] = 0
+    choices = []  # Grams chosen for each food group to reach each [k, t]
+
+    for index, (low, high) in enumerate(bounds):
+        new_smallest = np.full(smallest.shape, np.inf)
+        choice = np.zeros(smallest.shape, dtype=np.int16)
+        for grams in range(low, min(high, most_grams + 1)):
+            factor = table[index, grams] if grams < table.shape[1] else np.nan
+            if np.isnan(factor):  # No risk factor, so only the grams change
+                candidate = smallest[:, :most_grams + 1 - grams]
+                target = (slice(None), slice(grams, None))
+            else:
+                candidate = smallest[:-1, :most_grams + 1 - grams] + factor
+                target = (slice(1, None), slice(grams, None))
+            better = candidate < new_smallest[target]
+            new_smallest[target][better] = candidate[better]
+            choice[target][better] = grams
+        smallest = new_smallest
+        choices.append(choice)
+
+    solutions = []
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average_risk = smallest / np.arange(terms + 1)[:, np.newaxis]
+    average_risk[0] = np.inf  # A diet with no risk factors at all has no risk to compare
+
+    for g1, g2 in g_intake_range:
+        band = average_risk[:, g1:min(g2, most_grams + 1)]
+        if band.size == 0 or np.isinf(band.min()):
+            solutions.append(None)
+            continue
+
+        k, t = np.unravel_index(np.argmin(band), band.shape)
+        t += g1
+        diet = [0] * terms
+        for index in reversed(range(terms)):  # Walk back through the food groups to recover the grams of each
+            grams = int(choices[index][k, t])
+            diet[index] = grams
+            if grams < table.shape[1] and not np.isnan(table[index, grams]):
+                k -= 1
+            t -= grams
+        solutions.append([diet, sum(diet), float(np.average(risk(risk_category, diet)))])
+
+    return solutions
+
+def optimize_risk(risk_category, initial_grams_guess, g_range=None):
+    # Lowest average risk from an initial guess, keeping the grams of every food group within its curve so that
+    # every solution is a real diet. Given a g_range (lowest, highest) of total grams, like the ranges of g_intake_range,
+    # the total grams are kept within it as well. Uses L-BFGS-B, or SLSQP when there is a range of total grams,
+    # with the exact slopes of the curves. Returns the scipy OptimizeResult, with feasible set by feasible().
+    curves = risk_curves[risk_category]
+    bounds = [(curve.smooth_low(), curve.high) for curve in curves]  # Kept off grams where a slope is infinite
+    data = [index for index, curve in enumerate(curves) if curve.function is not None]
+    lowest, highest = np.array(bounds, dtype=float).T
+
+    def average_risk(grams):
+        grams = np.clip(grams, lowest, highest)
+        value = np.mean([curves[index].function(grams[index]) for index in data])
+        slopes = np.zeros(len(curves))
+        for index in data:
+            slopes[index] = curves[index].derivative(grams[index]) / len(data)
+        return value, slopes
+
+    initial_grams_guess = np.clip(np.asarray(initial_grams_guess, dtype=float), lowest, highest)
+    if g_range is None:
+        result = optimize.minimize(average_risk, initial_grams_guess, jac=True, method='L-BFGS-B', bounds=bounds)
+    else:
+        g1, g2 = g_range
+        constraints = [{'type': 'ineq', 'fun': lambda grams: np.sum(grams) - g1, 'jac': lambda grams: np.ones(len(grams))},
+                       {'type': 'ineq', 'fun': lambda grams: g2 - 1 - np.sum(grams), 'jac': lambda grams: -np.ones(len(grams))}]  # Whole grams must be below g2
+        result = optimize.minimize(average_risk, initial_grams_guess, jac=True, method='SLSQP', bounds=bounds, constraints=constraints,
+                                   options={'ftol': 1e-12, 'maxiter': 1000})  # The risk changes by tiny amounts per gram
+    result.feasible = feasible(result.x, bounds, g_range)
+    return result
+
+def feasible(grams, bounds, g_range=None, tolerance=1e-6):
+    # Whether grams are within bounds, one (lowest, highest) per food group with both included, and their total within
+    # g_range as optimize_risk() keeps it (lowest <= total <= highest - 1), give or take tolerance grams of rounding
+    grams = np.asarray(grams, dtype=float)
+    lowest, highest = np.array(bounds, dtype=float).T
+    if np.any(grams < lowest - tolerance) or np.any(grams > highest + tolerance):
+        return False
+    return g_range is None or g_range[0] - tolerance <= grams.sum() <= g_range[1] - 1 + tolerance
+
+def optimize_starts(risk_category, initial_guesses, g_range=None, processes=None):
+    # optimize_risk() from each initial guess, with the starts solved in parallel on up to processes cores (default all,
+    # 1 or a single start runs here without a pool)
+    solve = partial(optimize_risk, risk_category, g_range=g_range)
+    if processes == 1 or len(initial_guesses) <= 1:
+        return [solve(initial_grams_guess) for initial_grams_guess in initial_guesses]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(solve, initial_guesses))
@@ -0,0 +1,166 @@
+# Food Group Solver - uncertainty of the curves
+#
+# The curves were fitted with Eureqa to points read off published graphs, so every coefficient in them is uncertain, but
+# risk() only uses the fitted values. An Ensemble draws members sets of coefficients around the fitted ones and scores
+# diets with all of them at once: each equation is rewritten with its coefficients as arrays with one value per member, so
+# an (N, 12) array of diets gives an (members, N) array of risks in one numpy expression. Diets in whole grams look up
+# tables of every curve with every set of coefficients instead, like risk_table(). Diets are scored in chunks so memory
+# stays the same for any number of diets, and only quantiles over the members are kept.
+#
+# The coefficients are the numbers in the equations, apart from whole number powers after ** (g ** 2 stays a square).
+# Without standard errors for the fits, each coefficient is multiplied by 1 + relative_error * a standard normal number,
+# independently for every coefficient and member. ensemble_bands() then shows whether the lowest risk diet of each range
+# of total grams stays the lowest under other coefficients, or only is because of one fitted curve.
+
+import numpy as np
+import re
+
+from .core import Curve, g_intake_range, risk_batch, risk_curves
+from .simulation import intake_range_index
+
+quantile_levels = [0.05, 0.5, 0.95]  # Quantiles of the risks over the members given by default
+chunk_elements = 2 ** 22  # Most risks of members and diets computed at once, to bound memory
+
+number = re.compile(r'(\*\*\s*)?(?<![\w.])(\d+\.?\d*(?:[eE][-+]?\d+)?)')
+
+def parametrize(equation):
+    # The equation with each coefficient replaced by c[i], and the list of the coefficients, eg
+    # '1.5 + 0.25 * g ** 2' gives ('c[0] + c[1] * g ** 2', [1.5, 0.25])
+    coefficients = []
+
+    def replace(match):
+        power, literal = match.groups()
+        if power and re.fullmatch(r'\d+', literal):
+            return match.group(0)
+        coefficients.append(float(literal))
+        return (power or '') + 'c[%d]' % (len(coefficients) - 1)
+
+    return number.sub(replace, equation), coefficients
+
+class Ensemble:
+    # members sets of coefficients for the curves of risk_category, drawn around the fitted ones with a relative standard
+    # deviation of relative_error, from numpy.random.default_rng(seed)
+
+    def __init__(self, risk_category, members=100, relative_error=0.01, seed=None):
+        self.risk_category = risk_category
+        self.members = members
+        self.relative_error = relative_error
+        generator = np.random.default_rng(seed)
+        self.curves = []  # (index of the food group, curve, function of grams and coefficients, (coefficients, 1, members) array)
+        for index, curve in enumerate(risk_curves[risk_category]):
+            if curve.equation is None:
+                continue
+            template, coefficients = parametrize(curve.equation)
+            function = eval('lambda g, c: ' + template, Curve.namespace)
+            draws = np.array(coefficients) * (1 + relative_error * generator.standard_normal((members, len(coefficients))))
+            self.curves.append((index, curve, function, draws.T[:, np.newaxis, :]))
+        self.tables = {}  # factors() of each curve for every whole number of grams, filled in by table()
+
+    def factors(self, position, grams):
+        # Risk factors of the curve at position in self.curves for an array of grams within it, with each set of
+        # coefficients, as a (len(grams), members) array with 0 where there is none and a 0 or 1 array of where there is
+        with np.errstate(all='ignore'):
+            factors = self.curves[position][2](np.asarray(grams, dtype=float)[:, np.newaxis], self.curves[position][3])
+        factors = np.array(np.broadcast_to(factors, (len(grams), self.members)))
+        defined = ~np.isnan(factors) & (factors != 0)  # filter(None, ...) in risk() drops zero factors too
+        factors[~defined] = 0
+        return factors, defined.astype(np.uint8)
+
+    def table(self, position):
+        # factors() for 0, 1, 2 ... up to the highest grams of the curve, none where the grams are below it, like risk_table()
+        if position not in self.tables:
+            curve = self.curves[position][1]
+            grams = np.arange(int(curve.high) + 1)
+            factors, defined = self.factors(position, grams)
+            factors[grams < curve.low] = 0
+            defined[grams < curve.low] = 0
+            self.tables[position] = factors, defined
+        return self.tables[position]
+
+    def risks(self, grams_matrix):
+        # (members, N) average risk of each diet with each set of coefficients, NaN where a diet has no risk factors.
+        # Like risk(), food groups outside their curve or with a risk factor of 0 are left out of the average.
+        grams_matrix = np.atleast_2d(np.asarray(grams_matrix))
+        whole = np.issubdtype(grams_matrix.dtype, np.integer) or np.array_equal(grams_matrix, np.round(grams_matrix))
+        total = np.zeros((len(grams_matrix), self.members))  # One row per diet, so each diet's factors are contiguous
+        count = np.zeros((len(grams_matrix), self.members), dtype=np.uint8)
+        for position, (index, curve, function, coefficients) in enumerate(self.curves):
+            g = grams_matrix[:, index]
+            inside = np.flatnonzero((curve.low <= g) & (g <= curve.high))
+            if len(inside) == 0:
+                continue
+            if whole:
+                factors, defined = self.table(position)
+                rows = g[inside].astype(np.intp)
+                factors, defined = factors[rows], defined[rows]
+            else:
+                factors, defined = self.factors(position, g[inside])
+            if len(inside) == len(g):
+                total += factors
+                count += defined
+            else:
+                total[inside] += factors
+                count[inside] += defined
+        with np.errstate(all='ignore'):
+            return (total / count).T
+
+    def chunks(self, grams_matrix):
+        # (start, (members, rows) risks) of the diets in chunks of at most chunk_elements risks
+        grams_matrix = np.atleast_2d(np.asarray(grams_matrix))
+        rows = max(1, chunk_elements // self.members)
+        for start in range(0, len(grams_matrix), rows):
+            yield start, self.risks(grams_matrix[start:start + rows])
+
+    def quantiles(self, grams_matrix, levels=quantile_levels):
+        # (len(levels), N) quantiles of the risk of each diet over the members, NaN where a diet has no risk factors
+        grams_matrix = np.atleast_2d(np.asarray(grams_matrix))
+        result = np.full((len(levels), len(grams_matrix)), np.nan)
+        for start, risks in self.chunks(grams_matrix):
+            defined = ~np.isnan(risks).all(axis=0)
+            result[:, start:start + risks.shape[1]][:, defined] = np.quantile(risks[:, defined], levels, axis=0)
+        return result
+
+def ensemble_bands(ensemble, grams_matrix, g_intake_range=g_intake_range, levels=quantile_levels):
+    # For each range of g_intake_range, the diet of grams_matrix with the lowest risk with the fitted curves as
+    # {'diet', 'grams_sum', 'risk', 'quantiles', 'lowest', 'robustness'}, or None when no diet falls in the range:
+    # quantiles are those of its risk over the members of the ensemble, lowest the quantiles of the lowest risk of any diet
+    # in the range with each member, and robustness the share of the members for which it is still the lowest risk diet.
+    grams_matrix = np.atleast_2d(np.asarray(grams_matrix))
+    range_index = intake_range_index(grams_matrix.sum(axis=1), g_intake_range)
+    point = risk_batch(ensemble.risk_category, grams_matrix)[1]
+    point_best = []
+    for band in range(len(g_intake_range)):
+        rows = np.flatnonzero((range_index == band) & ~np.isnan(point))
+        point_best.append(int(rows[np.argmin(point[rows])]) if len(rows) else None)
+
+    members = np.arange(ensemble.members)
+    lowest = np.full((len(g_intake_range), ensemble.members), np.inf)
+    lowest_row = np.full((len(g_intake_range), ensemble.members), -1)
+    best_risks = np.full((len(g_intake_range), ensemble.members), np.nan)
+    for start, risks in ensemble.chunks(grams_matrix):
+        chunk_index = range_index[start:start + risks.shape[1]]
+        for band, best in enumerate(point_best):
+            if best is None:
+                continue
+            if start <= best < start + risks.shape[1]:
+                best_risks[band] = risks[:, best - start]
+            columns = np.flatnonzero(chunk_index == band)
+            if len(columns) == 0:
+                continue
+            band_risks = np.where(np.isnan(risks[:, columns]), np.inf, risks[:, columns])
+            chunk_best = np.argmin(band_risks, axis=1)
+            chunk_lowest = band_risks[members, chunk_best]
+            better = chunk_lowest < lowest[band]
+            lowest[band, better] = chunk_lowest[better]
+            lowest_row[band, better] = start + columns[chunk_best[better]]
+
+    bands = []
+    for band, best in enumerate(point_best):
+        if best is None:
+            bands.append(None)
+            continue
+        bands.append({'diet': grams_matrix[best].tolist(), 'grams_sum': int(grams_matrix[best].sum()), 'risk': float(point[best]),
+                      'quantiles': np.nanquantile(best_risks[band], levels).tolist(),
+                      'lowest': np.quantile(lowest[band][np.isfinite(lowest[band])], levels).tolist(),
+                      'robustness': float(np.mean(lowest_row[band] == best))})
+    return bands
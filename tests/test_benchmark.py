@@ -0,0 +1,18 @@
+# The agreement check of the benchmarks must only fail on real differences from risk()
+
+import numpy as np
+
+from food_group_solver.benchmark import agreement_tolerance, check_agreement, largest_difference
+
+
+def test_largest_difference_is_relative():
+    assert largest_difference([1e17, 1.0], [1e17 + 32, 1.0]) < agreement_tolerance
+    assert largest_difference([1.0], [1.0 + 1e-9]) > agreement_tolerance
+    assert largest_difference([1.0, np.nan], [1.0, 1.0]) == np.inf
+    assert largest_difference([np.nan], [np.nan]) == 0.0
+
+
+def test_check_agreement_with_huge_risk_factors():
+    # Seed 3 has fractional diets near 0 grams of legumes, where a Stroke curve reaches about 1e17
+    differences = check_agreement(2000, seed=3)
+    assert all(difference <= agreement_tolerance for difference in differences.values()), differences
@@ -0,0 +1,77 @@
+# Results read back from a ResultCache must be the same as computing them again
+
+import numpy as np
+
+from food_group_solver import g_intake_range, sample_bounds
+from food_group_solver.cache import ResultCache, cached_response_curves, cached_simulate, cached_solve_bands
+from food_group_solver.core import response_curves
+from food_group_solver.simulation import simulate
+from food_group_solver.solvers import solve_bands
+
+categories = ['Mortality', 'Obesity', 'Stroke']
+
+
+def assert_same_simulations(first, second):
+    assert set(first) == set(second)
+    for risk_category in first:
+        assert first[risk_category]['g_vars'] == second[risk_category]['g_vars']
+        assert first[risk_category]['best'] == second[risk_category]['best']
+        assert first[risk_category]['stats'].count == second[risk_category]['stats'].count
+        assert first[risk_category]['stats'].range_counts == second[risk_category]['stats'].range_counts
+        assert first[risk_category]['convergence'].trace() == second[risk_category]['convergence'].trace()
+
+
+def test_cached_simulate_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    expected = simulate(categories, 20000, sample_bounds, g_intake_range, seed=3, processes=1, chunk_size=5000, shared=True)
+    computed = cached_simulate(cache, categories, 20000, sample_bounds, g_intake_range, seed=3, processes=1, chunk_size=5000, shared=True)
+    read_back = cached_simulate(cache, categories, 20000, sample_bounds, g_intake_range, seed=3, processes=1, chunk_size=5000, shared=True)
+    assert len(list(tmp_path.glob('*.npz'))) == len(categories) + 1  # And the combined risk
+    assert_same_simulations(expected, computed)
+    assert_same_simulations(expected, read_back)
+
+
+def test_cached_simulate_separate_diets(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    expected = simulate(categories, 10000, sample_bounds, g_intake_range, seed=4, processes=1, chunk_size=5000)
+    cached_simulate(cache, categories[:1], 10000, sample_bounds, g_intake_range, seed=4, processes=1, chunk_size=5000)
+    assert_same_simulations(expected, cached_simulate(cache, categories, 10000, sample_bounds, g_intake_range, seed=4, processes=1, chunk_size=5000))
+
+
+def test_cached_solve_bands_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    expected = solve_bands('Hypertension', sample_bounds, g_intake_range)
+    assert cached_solve_bands(cache, 'Hypertension', sample_bounds, g_intake_range) == expected
+    assert cached_solve_bands(cache, 'Hypertension', sample_bounds, g_intake_range) == expected
+
+
+def test_cached_response_curves_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cached_response_curves(cache)
+    np.testing.assert_array_equal(cached_response_curves(cache), response_curves())
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1)
+    cache.put('first', {'values': np.arange(10)})
+    cache.put('second', {'values': np.arange(10)})
+    assert cache.get('first') is None
+    np.testing.assert_array_equal(cache.get('second')['values'], np.arange(10))
+
+
+def test_cached_simulate_keeps_combined_risk_when_categories_are_missing(tmp_path):
+    # Recomputing only some of the risk categories of shared diets must not replace the combined risk of all of them
+    from food_group_solver.cache import cache_key, curve_signature
+
+    cache = ResultCache(str(tmp_path))
+    arguments = (categories, 20000, sample_bounds, g_intake_range)
+    expected = simulate(*arguments, seed=5, processes=1, chunk_size=5000, shared=True)
+    cached_simulate(cache, *arguments, seed=5, processes=1, chunk_size=5000, shared=True)
+
+    settings = [sample_bounds, g_intake_range, 20000, 5, 5000, 10000, 10, True, 'random', None, 3]
+    for risk_category in ['Mortality', 'Stroke']:
+        (tmp_path / (cache_key('simulate', curve_signature(risk_category), settings, None) + '.npz')).unlink()
+    assert len(list(tmp_path.glob('*.npz'))) == 2
+
+    assert_same_simulations(expected, cached_simulate(cache, *arguments, seed=5, processes=1, chunk_size=5000, shared=True))
+    assert_same_simulations(expected, cached_simulate(cache, *arguments, seed=5, processes=1, chunk_size=5000, shared=True))
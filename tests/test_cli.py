@@ -0,0 +1,63 @@
+# The command line must turn bad options into usage errors instead of tracebacks
+
+import pytest
+
+from food_group_solver.cli import main
+
+
+def test_simulate_rejects_no_tries(capsys):
+    with pytest.raises(SystemExit):
+        main(['simulate', '--tries', '0'])
+    assert 'at least 1' in capsys.readouterr().err
+
+
+def test_simulate_one_try_has_no_linear_fit(tmp_path, capsys):
+    main(['simulate', '--tries', '1', '--seed', '0', '--processes', '1', '--no-plots', '--metrics', str(tmp_path / 'metrics.json')])
+    assert 'No linear fit of 1 diets' in capsys.readouterr().out
+
+
+def test_simulate_store_refuses_options_it_would_ignore(tmp_path, capsys):
+    store = str(tmp_path / 'store')
+    report = ['--processes', '1', '--no-plots', '--metrics', str(tmp_path / 'metrics.json')]
+    for options in [['--sampler', 'sobol'], ['--tolerance', '0.01'], ['--separate']]:
+        with pytest.raises(SystemExit, match=options[0]):
+            main(['simulate', '--store', store, '--tries', '1000'] + options + report)
+
+    main(['simulate', '--store', store, '--tries', '1000', '--seed', '2'] + report)
+    with pytest.raises(SystemExit, match='1000 diets'):
+        main(['simulate', '--store', store, '--tries', '2000'] + report)
+    with pytest.raises(SystemExit, match='seed 2'):
+        main(['simulate', '--store', store, '--seed', '3'] + report)
+    capsys.readouterr()
+    main(['simulate', '--store', store] + report)
+    assert 'Diets in each range' in capsys.readouterr().out
+
+
+def test_simulate_sample_size_reaches_the_plots(tmp_path, monkeypatch):
+    # A sample larger than --density-points is what makes the scatter plots density plots
+    from food_group_solver import plots
+
+    sampled = []
+    monkeypatch.setattr(plots, 'simulation_plot', lambda risk_category, stats, equation, density_points: sampled.append((len(stats.sample_grams), density_points)))
+    monkeypatch.setattr(plots, 'render', lambda rendering, processes: None)
+    main(['simulate', '--tries', '3000', '--seed', '0', '--processes', '1', '--sample-size', '2500', '--density-points', '2000',
+          '--metrics', str(tmp_path / 'metrics.json')])
+    assert sampled and all(2000 < size <= 2500 and density_points == 2000 for size, density_points in sampled)
+
+
+@pytest.mark.parametrize('weight, message', [('Stroke2', 'CATEGORY=WEIGHT'), ('Stroke=two', 'not a number'), ('Gout=1', 'CATEGORY=WEIGHT'),
+                                             ('Stroke=-1', 'positive')])
+def test_pareto_rejects_malformed_weights(weight, message, capsys):
+    with pytest.raises(SystemExit):
+        main(['pareto', '--weights', weight])
+    assert message in capsys.readouterr().err
+
+
+def test_pareto_weights(tmp_path, capsys):
+    from food_group_solver import risk_groups
+
+    report = ['--tries', '2000', '--seed', '0', '--processes', '1', '--metrics', str(tmp_path / 'metrics.json')]
+    with pytest.raises(SystemExit, match='weights must be'):
+        main(['pareto', '--weights'] + [risk_category + '=0' for risk_category in risk_groups] + report)
+    main(['pareto', '--weights', 'Stroke=2', 'Breast Cancer=0.5'] + report)
+    assert 'for the weights [1.0, 1.0, 1.0, 1.0, 2.0, 0.5]' in capsys.readouterr().out
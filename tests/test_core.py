@@ -0,0 +1,46 @@
+# risk_batch() and risk_matrix() must give the same risks as risk(), one diet at a time
+
+import numpy as np
+import pytest
+
+from food_group_solver import food_groups, risk, risk_batch, risk_curves, risk_groups, risk_matrix, sample_bounds
+from food_group_solver.simulation import draw_diets
+
+
+def diets(seed=0):
+    # Whole grams within sample_bounds, and from 0 to 700 grams so many are outside some curves
+    generator = np.random.default_rng(seed)
+    return np.concatenate([draw_diets(generator, 300, sample_bounds), draw_diets(generator, 300, [(0, 701)] * len(food_groups))])
+
+
+def average_risk(risk_category, diet):
+    factors = risk(risk_category, list(diet))
+    return np.average(factors) if factors else np.nan
+
+
+@pytest.mark.parametrize('risk_category', risk_groups)
+@pytest.mark.parametrize('fraction', [0.0, 0.37])
+def test_risk_batch_matches_risk(risk_category, fraction):
+    grams = diets() + fraction
+    factors, average = risk_batch(risk_category, grams)
+    assert factors.shape == grams.shape
+    for diet, diet_factors, diet_average in zip(grams, factors, average):
+        expected = risk(risk_category, list(diet))
+        np.testing.assert_allclose(diet_factors[~np.isnan(diet_factors)], expected, rtol=1e-12)
+        np.testing.assert_allclose(diet_average, average_risk(risk_category, diet), rtol=1e-12)
+
+
+def test_risk_batch_leaves_out_food_groups_outside_their_curve():
+    curves = risk_curves['Mortality']
+    diet = [curve.high + 1 for curve in curves]
+    factors, average = risk_batch('Mortality', [diet])
+    assert np.isnan(factors).all()
+    assert np.isnan(average[0])
+    assert risk('Mortality', diet) == []
+
+
+@pytest.mark.parametrize('fraction', [0.0, 0.5])
+def test_risk_matrix_matches_risk(fraction):
+    grams = diets(1) + fraction
+    expected = np.array([[average_risk(risk_category, diet) for risk_category in risk_groups] for diet in grams])
+    np.testing.assert_allclose(risk_matrix(risk_groups, grams), expected, rtol=1e-12)
@@ -0,0 +1,47 @@
+# The Pareto front must keep exactly the diets no other diet beats in every risk category
+
+import numpy as np
+import pytest
+
+from food_group_solver import combined_category, g_intake_range, risk_groups, sample_bounds
+from food_group_solver.pareto import ParetoFront, non_dominated, pareto_front
+from food_group_solver.simulation import simulate
+
+
+def test_non_dominated_on_a_small_front():
+    risks = [[1, 5],  # On the front
+             [2, 2],  # On the front
+             [5, 1],  # On the front
+             [3, 3],  # Beaten by [2, 2]
+             [2, 6],  # Beaten by [1, 5]
+             [2, 2],  # The same as an earlier row
+             [5, 2],  # Beaten by [5, 1] in one category and equal in the other
+             [0.5, 9]]  # On the front
+    assert sorted(non_dominated(risks).tolist()) == [0, 1, 2, 7]
+
+
+@pytest.mark.parametrize('block', [1, 2, 32])
+def test_non_dominated_matches_pairwise_comparison(block):
+    risks = np.random.default_rng(0).integers(0, 6, (300, 3)).astype(float)
+    expected = [row for row in range(len(risks))
+                if not any((risks[other] <= risks[row]).all() and ((risks[other] < risks[row]).any() or other < row) for other in range(len(risks)) if other != row)]
+    assert sorted(non_dominated(risks, block).tolist()) == expected
+
+
+def test_equal_weights_give_the_combined_best():
+    front = pareto_front(20000, sample_bounds, g_intake_range, seed=4, processes=1, chunk_size=5000)
+    simulations = simulate(risk_groups, 20000, sample_bounds, g_intake_range, seed=4, processes=1, chunk_size=5000, shared=True)
+    assert any(solution[0] is not None for solution in front.query())
+    for solution, combined in zip(front.query(), simulations[combined_category]['g_vars']):
+        assert solution[:2] == combined[:2]
+        if combined[0] is not None:
+            assert solution[2] == pytest.approx(combined[2], rel=1e-12)
+
+
+def test_front_save_and_load(tmp_path):
+    front = pareto_front(5000, sample_bounds, g_intake_range, seed=1, processes=1)
+    front.save(str(tmp_path / 'front.npz'))
+    loaded = ParetoFront.load(str(tmp_path / 'front.npz'))
+    assert loaded.query({'Stroke': 3}) == front.query({'Stroke': 3})
+    with pytest.raises(ValueError):
+        front.weights({'Gout': 1})
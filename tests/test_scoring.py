@@ -0,0 +1,66 @@
+# The bulk scorer must give the risks of risk_matrix() whatever the format of the files and the size of the chunks
+
+import csv
+import numpy as np
+import pytest
+
+from food_group_solver import food_groups, risk_groups, risk_matrix, sample_bounds
+from food_group_solver.scoring import domain_flags, score_file
+from food_group_solver.simulation import draw_diets
+
+
+@pytest.fixture
+def diets():
+    # Whole grams within sample_bounds and some beyond the ends of the curves
+    generator = np.random.default_rng(5)
+    return np.concatenate([draw_diets(generator, 250, sample_bounds), draw_diets(generator, 50, [(0, 801)] * len(food_groups))])
+
+
+def read_scores(path):
+    if path.endswith('.npy'):
+        scores = np.load(path)
+        return np.stack([scores[risk_category] for risk_category in risk_groups], axis=1), \
+            np.stack([scores[risk_category + ' out of range'] for risk_category in risk_groups], axis=1)
+    with open(path) as file:
+        rows = list(csv.DictReader(file))
+    return np.array([[float(row[risk_category]) for risk_category in risk_groups] for row in rows]), \
+        np.array([[int(row[risk_category + ' out of range']) for risk_category in risk_groups] for row in rows])
+
+
+def check(diets, output):
+    risks, flags = read_scores(output)
+    np.testing.assert_allclose(risks, risk_matrix(risk_groups, diets), rtol=1e-15)
+    np.testing.assert_array_equal(flags, domain_flags(risk_groups, diets))
+    assert flags.any()
+
+
+@pytest.mark.parametrize('output', ['risks.csv', 'risks.npy'])
+def test_score_csv_with_a_header(diets, output, tmp_path):
+    # Columns in another order than food_groups, found by name
+    order = list(reversed(range(len(food_groups))))
+    with open(tmp_path / 'diets.csv', 'w') as file:
+        file.write(','.join('"%s"' % food_groups[index] for index in order) + '\n')
+        np.savetxt(file, diets[:, order], delimiter=',', fmt='%d')
+    assert score_file(str(tmp_path / 'diets.csv'), str(tmp_path / output), chunk_size=70) == len(diets)
+    check(diets, str(tmp_path / output))
+
+
+@pytest.mark.parametrize('output', ['risks.csv', 'risks.npy'])
+def test_score_csv_without_a_header(diets, output, tmp_path):
+    np.savetxt(tmp_path / 'diets.csv', diets, delimiter=',', fmt='%d')
+    assert score_file(str(tmp_path / 'diets.csv'), str(tmp_path / output), chunk_size=70) == len(diets)
+    check(diets, str(tmp_path / output))
+
+
+@pytest.mark.parametrize('output', ['risks.csv', 'risks.npy'])
+def test_score_npy(diets, output, tmp_path):
+    np.save(tmp_path / 'diets.npy', diets + 0.25)
+    assert score_file(str(tmp_path / 'diets.npy'), str(tmp_path / output), chunk_size=1000) == len(diets)
+    check(diets + 0.25, str(tmp_path / output))
+
+
+def test_score_csv_header_without_a_food_group(tmp_path):
+    with open(tmp_path / 'diets.csv', 'w') as file:
+        file.write(','.join(food_groups[1:]) + '\n' + ','.join(['1'] * 11) + '\n')
+    with pytest.raises(ValueError, match='Whole grains'):
+        score_file(str(tmp_path / 'diets.csv'), str(tmp_path / 'risks.csv'))
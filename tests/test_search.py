@@ -0,0 +1,34 @@
+# The local search must never make a diet worse, nor leave its range of total grams or the bounds
+
+import numpy as np
+import pytest
+
+from food_group_solver import g_intake_range, risk_batch, risk_groups, sample_bounds
+from food_group_solver.search import Diet, refine_bands
+from food_group_solver.simulation import simulate
+
+
+@pytest.mark.parametrize('risk_category', risk_groups)
+def test_refine_never_makes_a_diet_worse(risk_category):
+    solutions = simulate([risk_category], 3000, sample_bounds, g_intake_range, seed=2, processes=1)[risk_category]['g_vars']
+    refined, evaluations = refine_bands(risk_category, solutions, sample_bounds, g_intake_range)
+    assert evaluations > 0
+    for solution, better, (g1, g2) in zip(solutions, refined, g_intake_range):
+        if solution[0] is None:
+            assert better == solution
+            continue
+        diet, grams_sum, risk = better
+        assert risk <= solution[2]
+        assert g1 <= grams_sum < g2 and grams_sum == sum(diet)
+        assert all(low <= grams < high for grams, (low, high) in zip(diet, sample_bounds))
+        assert risk == risk_batch(risk_category, [diet])[1][0]
+
+
+def test_diet_running_total_matches_risk_batch():
+    diet = Diet('Stroke', [50] * 12)
+    diet.set(3, 400)  # Beyond the curve of some food groups
+    diet.set(3, 20)
+    diet.set(0, 0)
+    np.testing.assert_allclose(diet.average(), risk_batch('Stroke', [diet.grams])[1][0], rtol=1e-12)
+    np.testing.assert_allclose(diet.average_with(5, np.array([10, 30])), risk_batch('Stroke', [diet.grams[:5] + [g] + diet.grams[6:] for g in [10, 30]])[1],
+                               rtol=1e-12)
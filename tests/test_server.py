@@ -0,0 +1,46 @@
+# The scoring server must give the risks of risk_matrix(), and stop cleanly with connections still open
+
+import gc
+import http.client
+import json
+import logging
+import numpy as np
+import pytest
+
+from food_group_solver import food_groups, risk_groups, risk_matrix, sample_bounds
+from food_group_solver.benchmark import running_server
+from food_group_solver.server import score_remote
+from food_group_solver.simulation import draw_diets
+
+
+def test_server_scores_like_risk_matrix():
+    generator = np.random.default_rng(8)
+    diets = np.concatenate([draw_diets(generator, 200, sample_bounds), draw_diets(generator, 50, [(0, 801)] * len(food_groups)), [[5000] * 12]]) + 0.5
+    expected = risk_matrix(risk_groups, diets)
+    with running_server() as port:
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        risks = score_remote(diets.tolist(), port=port, connection=connection)
+        stroke = score_remote(diets[:3].tolist(), ['Stroke'], port=port)
+        with pytest.raises(ValueError, match='12 food groups'):
+            score_remote([[1, 2]], port=port)
+        connection.request('GET', '/stats')
+        stats = json.loads(connection.getresponse().read())
+        connection.close()
+
+    for position, risk_category in enumerate(risk_groups):
+        np.testing.assert_array_equal(np.array(risks[risk_category], dtype=float), expected[:, position])
+    assert np.isnan(expected[-1]).all()  # Outside every curve, which the server sends as null
+    assert list(stroke) == ['Stroke'] and stroke['Stroke'] == risks['Stroke'][:3]
+    assert stats['requests'] == 2 and stats['diets'] == len(diets) + 3
+
+
+def test_server_stops_with_connections_kept_alive(caplog):
+    with caplog.at_level(logging.DEBUG, logger='asyncio'):
+        with running_server() as port:
+            connections = [http.client.HTTPConnection('127.0.0.1', port) for connection in range(3)]
+            for connection in connections:
+                score_remote([[50] * 12], ['Stroke'], port=port, connection=connection)
+        gc.collect()
+    for connection in connections:
+        connection.close()
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR], caplog.text
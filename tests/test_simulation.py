@@ -0,0 +1,97 @@
+# The random simulation must give exactly the same results for a seed whatever the number of processes
+
+import numpy as np
+import pytest
+
+from food_group_solver import g_intake_range, risk_groups, sample_bounds
+from food_group_solver.simulation import Convergence, simulate
+
+
+def assert_identical(first, second):
+    assert set(first) == set(second)
+    for risk_category in first:
+        for name in ['tracker', 'stats']:
+            first_arrays = first[risk_category][name].arrays()
+            second_arrays = second[risk_category][name].arrays()
+            assert set(first_arrays) == set(second_arrays)
+            for key in first_arrays:
+                np.testing.assert_array_equal(first_arrays[key], second_arrays[key], err_msg=risk_category + ' ' + name + ' ' + key)
+        assert first[risk_category]['g_vars'] == second[risk_category]['g_vars']
+
+
+@pytest.mark.parametrize('shared', [True, False])
+@pytest.mark.parametrize('sampler', ['random', 'sobol'])
+def test_simulate_is_the_same_for_any_processes(shared, sampler):
+    arguments = (risk_groups, 25000, sample_bounds, g_intake_range)
+    settings = dict(seed=7, chunk_size=4000, sample_size=500, shared=shared, sampler=sampler)
+    assert_identical(simulate(*arguments, processes=1, **settings), simulate(*arguments, processes=3, **settings))
+
+
+def test_band_tracker_keeps_the_first_of_equal_risks():
+    # Many diets tied at the k-th lowest risk, where argpartition() alone keeps later ones
+    from food_group_solver.simulation import BandTracker
+
+    risks = np.random.default_rng(0).integers(0, 3, 1000).astype(float)
+    diets = np.zeros((1000, 12), dtype=int)
+    diets[:, 0] = np.arange(1000)
+    tracker = BandTracker([(0, 1000)], k=5)
+    tracker.add(diets, risks)
+    assert [diet[0] for diet, grams_sum, risk in tracker.top(0)] == np.argsort(risks, kind='stable')[:5].tolist()
+
+
+def test_sample_store_round_trip_matches_simulate(tmp_path):
+    # The store keeps the same diets as simulate(shared=True) with the same seed, and their risks as float32
+    from food_group_solver.simulation import SampleStore, build_sample_store, summarize_store
+
+    expected = simulate(risk_groups, 12000, sample_bounds, g_intake_range, seed=9, processes=1, chunk_size=5000, shared=True)
+    store = build_sample_store(str(tmp_path), 12000, sample_bounds, risk_groups, seed=9, processes=2, chunk_size=5000)
+    assert len(store) == 12000 and SampleStore(str(tmp_path)).risk_categories == risk_groups
+    summary = summarize_store(str(tmp_path), g_intake_range, seed=9, processes=1, chunk_size=4000)
+
+    assert set(summary) == set(expected)
+    for risk_category in expected:
+        assert summary[risk_category]['stats'].count == expected[risk_category]['stats'].count
+        assert summary[risk_category]['stats'].range_counts == expected[risk_category]['stats'].range_counts
+        for stored, simulated in zip(summary[risk_category]['g_vars'], expected[risk_category]['g_vars']):
+            assert stored[:2] == simulated[:2]
+            if simulated[0] is not None:
+                assert stored[2] == pytest.approx(simulated[2], rel=1e-6)
+
+
+def test_convergence_fires_after_window_chunks_without_improvement():
+    from food_group_solver.simulation import BandTracker
+
+    convergence = Convergence(tolerance=0.01, window=3)
+    tracker = BandTracker([(0, 100), (100, 200)], k=1)
+    for chunk, risk in enumerate([0.9, 0.5, 0.495, 0.495, 0.49]):
+        tracker.add([[chunk] + [0] * 11], [risk])
+        convergence.add(tracker, chunk + 1)
+        assert not convergence.converged()  # The drop from 0.9 is still within the window
+    tracker.add([[100] + [0] * 11], [0.7])  # A first diet in the second range is an infinite drop
+    convergence.add(tracker, 6)
+    for tries in range(7, 10):
+        assert not convergence.converged()
+        tracker.add([[0] * 12], [0.49])
+        convergence.add(tracker, tries)
+    assert convergence.converged()
+    assert Convergence(None, 3).converged() is False
+
+
+def converged_after(convergence, chunks):
+    # Whether convergence had converged after its first chunks
+    earlier = Convergence(convergence.tolerance, convergence.window)
+    earlier.best = convergence.best[:chunks]
+    return earlier.converged()
+
+
+@pytest.mark.parametrize('shared', [True, False])
+def test_simulate_stops_once_converged(shared):
+    simulations = simulate(risk_groups, 200000, sample_bounds, g_intake_range, seed=1, processes=2, chunk_size=5000, shared=shared,
+                           tolerance=0.05, window=2)
+    for simulation in simulations.values():
+        assert simulation['convergence'].converged() and simulation['stats'].count < 200000
+    # Not one chunk later than needed: shared diets stop once every risk category has converged, separate ones each on its own
+    groups = [list(simulations.values())] if shared else [[simulation] for simulation in simulations.values()]
+    for group in groups:
+        chunks = len(group[0]['convergence'].best)
+        assert not all(converged_after(simulation['convergence'], chunks - 1) for simulation in group)
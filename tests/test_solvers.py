@@ -0,0 +1,69 @@
+# solve_bands() must find the same lowest risk as trying every diet
+
+import itertools
+import numpy as np
+import pytest
+
+from food_group_solver import risk, risk_curves, risk_groups
+from food_group_solver.solvers import solve_bands
+
+
+def small_bounds(risk_category):
+    # Three grams for half the food groups, some of them across the end of their curve, and one for the others
+    bounds = []
+    for index, curve in enumerate(risk_curves[risk_category]):
+        if index % 2 == 0:
+            low = int(curve.high) - 1 if index % 4 == 0 else 10
+            bounds.append((low, low + 3))
+        else:
+            bounds.append((5, 6))
+    return bounds
+
+
+@pytest.mark.parametrize('risk_category', risk_groups)
+def test_solve_bands_matches_brute_force(risk_category):
+    bounds = small_bounds(risk_category)
+    diets = [list(diet) for diet in itertools.product(*[range(low, high) for low, high in bounds])]
+    sums = np.array([sum(diet) for diet in diets])
+    g_intake_range = [(int(sums.min()), int(np.median(sums))), (int(np.median(sums)), int(sums.max()) + 1), (int(sums.max()) + 1, int(sums.max()) + 10)]
+
+    solutions = solve_bands(risk_category, bounds, g_intake_range)
+    for (g1, g2), solution in zip(g_intake_range, solutions):
+        risks = [np.average(risk(risk_category, diet)) for diet, grams_sum in zip(diets, sums) if g1 <= grams_sum < g2 and risk(risk_category, diet)]
+        if not risks:
+            assert solution is None
+            continue
+        diet, grams_sum, solution_risk = solution
+        assert g1 <= grams_sum < g2 and grams_sum == sum(diet)
+        assert all(low <= grams < high for grams, (low, high) in zip(diet, bounds))
+        assert solution_risk == pytest.approx(min(risks), rel=1e-12)
+        assert solution_risk == pytest.approx(np.average(risk(risk_category, diet)), rel=1e-12)
+
+
+@pytest.mark.parametrize('risk_category', ['Hypertension', 'Coronary heart disease', 'Stroke'])
+def test_optimize_risk_in_a_range_converges_to_a_feasible_diet(risk_category):
+    # These risk categories have curves like sqrt(g) whose slope is infinite at 0 grams
+    from food_group_solver import g_intake_range, sample_bounds
+    from food_group_solver.solvers import feasible, optimize_risk
+
+    generator = np.random.default_rng(0)
+    for g_range in g_intake_range[1:5]:
+        for start in range(4):
+            guess = [int(generator.integers(low, high)) for low, high in sample_bounds]
+            result = optimize_risk(risk_category, guess, g_range)
+            assert result.success, result.message
+            assert result.feasible
+            assert feasible(result.x, [(curve.low, curve.high) for curve in risk_curves[risk_category]], g_range)
+
+
+def test_optimize_starts_without_a_pool_in_a_range():
+    from food_group_solver import g_intake_range, sample_bounds
+    from food_group_solver.solvers import optimize_risk, optimize_starts
+
+    generator = np.random.default_rng(1)
+    guesses = [[int(generator.integers(low, high)) for low, high in sample_bounds] for start in range(2)]
+    results = optimize_starts('Mortality', guesses, g_intake_range[2], processes=1)
+    for guess, result in zip(guesses, results):
+        np.testing.assert_array_equal(result.x, optimize_risk('Mortality', guess, g_intake_range[2]).x)
+        assert result.feasible
+        assert g_intake_range[2][0] - 1e-6 <= result.x.sum() <= g_intake_range[2][1] - 1 + 1e-6
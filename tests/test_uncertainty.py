@@ -0,0 +1,47 @@
+# An ensemble without any change to the coefficients must give the risks of the fitted curves
+
+import numpy as np
+import pytest
+
+from food_group_solver import food_groups, g_intake_range, risk_batch, risk_groups, sample_bounds
+from food_group_solver.simulation import draw_diets
+from food_group_solver.uncertainty import Ensemble, ensemble_bands, parametrize
+
+
+def diets(seed=6):
+    generator = np.random.default_rng(seed)
+    return np.concatenate([draw_diets(generator, 400, sample_bounds), draw_diets(generator, 100, [(0, 801)] * len(food_groups))])
+
+
+def test_parametrize_keeps_whole_powers():
+    assert parametrize('1.5 + 0.25 * g ** 2 - 3e-5 * g ** 0.5') == ('c[0] + c[1] * g ** 2 - c[2] * g ** c[3]', [1.5, 0.25, 3e-5, 0.5])
+
+
+@pytest.mark.parametrize('risk_category', risk_groups)
+@pytest.mark.parametrize('fraction', [0.0, 0.3])
+def test_ensemble_without_error_matches_risk_batch(risk_category, fraction):
+    grams = diets() + fraction
+    ensemble = Ensemble(risk_category, members=4, relative_error=0, seed=0)
+    expected = risk_batch(risk_category, grams)[1]
+    risks = ensemble.risks(grams)
+    assert risks.shape == (4, len(grams))
+    for member in risks:
+        np.testing.assert_allclose(member, expected, rtol=1e-12)
+    np.testing.assert_allclose(ensemble.quantiles(grams), np.tile(expected, (3, 1)), rtol=1e-12)
+
+
+def test_ensemble_bands_without_error_are_robust():
+    grams = diets(7)
+    bands = ensemble_bands(Ensemble('Stroke', members=5, relative_error=0, seed=0), grams, g_intake_range)
+    assert any(band is not None for band in bands)
+    for band in bands:
+        if band is not None:
+            assert band['robustness'] == 1.0
+            assert band['quantiles'] == pytest.approx([band['risk']] * 3, rel=1e-12)
+            assert band['lowest'] == pytest.approx([band['risk']] * 3, rel=1e-12)
+
+
+def test_ensemble_members_differ_with_error():
+    risks = Ensemble('Mortality', members=20, relative_error=0.05, seed=1).risks(diets()[:50])
+    assert (risks.std(axis=0) > 0).all()
+    np.testing.assert_array_equal(risks, Ensemble('Mortality', members=20, relative_error=0.05, seed=1).risks(diets()[:50]))